@@ -0,0 +1,82 @@
+import numpy as np
+import stochastic_full as sf
+
+def simulate_soc_tte(n_paths, initial_soc=100.0, initial_tte=None, t_end=None, n_steps=None, n_out=200, seed=None):
+    """
+    Advance (SOC, TTE) together in time for an ensemble of paths.
+    Every step draws one Brownian increment per path and feeds the same dW to rk4_step_soc and
+    rk4_step_tte, so each TTE forecast is driven by its own simulated SOC trajectory. Paths stop
+    (SOC = TTE = 0) when SOC reaches 0, which records their realized empty time.
+
+    Returns a dict with the output times, the (n_out x n_paths) SOC and TTE snapshots, the
+    realized empty times (inf if never empty) and the forecast error of the predicted empty time
+    t + TTE(t) against the realized one (NaN once a path is empty).
+    """
+    rng = np.random.default_rng(seed)
+    t_end = sf.T if t_end is None else t_end
+    n_steps = sf.N if n_steps is None else n_steps
+    initial_tte = sf.totalBatteryLife if initial_tte is None else initial_tte
+    dt = t_end / n_steps
+    out_steps = np.unique(np.linspace(0, n_steps, n_out).astype(int))
+
+    soc = np.full(n_paths, float(initial_soc))
+    tte = np.full(n_paths, float(initial_tte))
+    empty_time = np.full(n_paths, np.inf)
+    soc_out = np.empty((len(out_steps), n_paths))
+    tte_out = np.empty((len(out_steps), n_paths))
+    k_out = 0
+    for step in range(n_steps + 1):
+        if step == out_steps[k_out]:
+            soc_out[k_out] = soc
+            tte_out[k_out] = tte
+            k_out += 1
+        if step == n_steps:
+            break
+        alive = np.flatnonzero(np.isinf(empty_time))
+        if len(alive) == 0:
+            soc_out[k_out:] = 0.0
+            tte_out[k_out:] = 0.0
+            break
+        t = step * dt
+        dW = rng.normal(0, np.sqrt(dt), len(alive))
+        soc_alive = soc[alive]
+        soc_new, _ = sf.rk4_step_soc(soc_alive, t, dt, dW)
+        tte[alive] = sf.rk4_step_tte(soc_alive, tte[alive], t, dt, dW)
+        soc[alive] = soc_new
+
+        emptied = alive[soc_new <= 0]
+        empty_time[emptied] = (step + 1) * dt
+        soc[emptied] = 0.0
+        tte[emptied] = 0.0
+
+    out_time = out_steps * dt
+    alive_out = out_time[:, None] < empty_time[None, :]
+    forecast_error = np.where(alive_out, out_time[:, None] + tte_out - empty_time[None, :], np.nan)
+    return {
+        'out_time': out_time,
+        'soc': soc_out,
+        'tte': tte_out,
+        'empty_time': empty_time,
+        'forecast_error': forecast_error,
+    }
+
+def forecast_summary(result):
+    """Bias and RMSE (hours) of the predicted empty time over the paths still running at each output time."""
+    error = result['forecast_error']
+    running = np.sum(~np.isnan(error), axis=1)
+    count = np.where(running > 0, running, np.nan)
+    bias = np.nansum(error, axis=1) / count
+    rmse = np.sqrt(np.nansum(error**2, axis=1) / count)
+    return {'out_time': result['out_time'], 'running': running, 'bias': bias, 'rmse': rmse}
+
+if __name__ == "__main__":
+    import time
+
+    start = time.time()
+    result = simulate_soc_tte(2000, seed=0)
+    summary = forecast_summary(result)
+    print(f"2000 coupled SOC+TTE paths in {time.time() - start:.1f} s; "
+          f"realized empty time {np.mean(result['empty_time']):.4f} +/- {np.std(result['empty_time']):.4f} h")
+    for k in np.linspace(0, len(summary['out_time']) - 1, 6).astype(int):
+        print(f"  t = {summary['out_time'][k]:.2f} h: {summary['running'][k]:4d} running, "
+              f"forecast bias {summary['bias'][k]:+.4f} h, RMSE {summary['rmse'][k]:.4f} h")
@@ -0,0 +1,55 @@
+import numpy as np
+import matplotlib.pyplot as plt
+
+class PathDensity:
+    """
+    Streaming time x SOC histogram of a path ensemble.
+    Paths are binned as they arrive (one path or a block of paths at a time) and then dropped,
+    so memory and drawing cost depend on the bin counts, not on the number of paths.
+    """
+    def __init__(self, t_end, n_time_bins=400, soc_range=(0.0, 105.0), n_soc_bins=210):
+        self.time_edges = np.linspace(0, t_end, n_time_bins + 1)
+        self.soc_edges = np.linspace(soc_range[0], soc_range[1], n_soc_bins + 1)
+        self.counts = np.zeros((n_time_bins, n_soc_bins), dtype=np.int64)
+        self.n_paths = 0
+        self._time_bins = (None, None)  # (times array, its bin indices) reused across adds
+
+    def _bin_times(self, times):
+        cached_times, cached_bins = self._time_bins
+        if cached_times is not times:
+            n = len(self.time_edges) - 1
+            cached_bins = np.clip(np.searchsorted(self.time_edges, times, side='right') - 1, 0, n - 1)
+            self._time_bins = (times, cached_bins)
+        return cached_bins
+
+    def add(self, times, paths):
+        """Bin one path (N,) or a block of paths (k x N) sampled at times (N,)."""
+        paths = np.atleast_2d(paths)
+        n_time, n_soc = self.counts.shape
+        time_bins = self._bin_times(times)
+        soc_width = self.soc_edges[1] - self.soc_edges[0]
+        soc_bins = np.clip(((paths - self.soc_edges[0]) / soc_width).astype(np.int64), 0, n_soc - 1)
+        flat = time_bins[None, :] * n_soc + soc_bins
+        self.counts += np.bincount(flat.ravel(), minlength=n_time * n_soc).reshape(n_time, n_soc)
+        self.n_paths += len(paths)
+
+    def quantiles(self, qs=(0.05, 0.5, 0.95)):
+        """SOC quantiles per time bin, interpolated within the SOC bins."""
+        cdf = np.cumsum(self.counts, axis=1) / np.maximum(self.counts.sum(axis=1, keepdims=True), 1)
+        cdf = np.concatenate([np.zeros((len(cdf), 1)), cdf], axis=1)
+        return {q: np.array([np.interp(q, row, self.soc_edges) for row in cdf]) for q in qs}
+
+    def plot(self, ax=None, quantiles=(0.05, 0.5, 0.95), cmap='Oranges', log=True):
+        """Draw the density image (fraction of paths per bin) with quantile overlays."""
+        if ax is None:
+            ax = plt.gca()
+        density = self.counts.T / max(self.n_paths, 1)
+        image = np.log10(density + 1e-6) if log else density
+        extent = (self.time_edges[0], self.time_edges[-1], self.soc_edges[0], self.soc_edges[-1])
+        ax.imshow(image, origin='lower', aspect='auto', extent=extent, cmap=cmap, interpolation='nearest')
+        centres = 0.5 * (self.time_edges[1:] + self.time_edges[:-1])
+        for q, values in self.quantiles(quantiles).items():
+            ax.plot(centres, values, color='black', linewidth=1.0 if q != 0.5 else 1.8,
+                    linestyle='-' if q == 0.5 else '--', label=f"q{q:g}")
+        ax.legend(loc='upper right', fontsize=9)
+        return ax
@@ -0,0 +1,165 @@
+import numpy as np
+from scipy.linalg import solve_banded
+import stochastic_full as sf
+
+def linear_drift_coefficients():
+    """drift_soc(SOC) = slope * SOC + intercept (the SOC drift is linear)."""
+    intercept = sf.drift_soc(0.0)
+    return sf.drift_soc(1.0) - intercept, intercept
+
+def solve_fokker_planck(initial_soc=100.0, t_end=None, n_cells=4000, n_steps=2000, n_out=200,
+                        soc_axis=None, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95), headroom=20.0):
+    """
+    Evolve the SOC probability density of dSOC = drift_soc dt + diffusion_soc dW on [0, 100]
+    with an absorbing boundary at 0 (empty) and a reflecting one at 100.
+
+    Finite volumes whose edges move with the deterministic flow: drift_soc is linear, so cells
+    are advected exactly (no numerical diffusion from the steep drift) and only the diffusion
+    term is integrated, implicitly (backward Euler, tridiagonal solve per step). Mass leaves
+    through the Dirichlet condition at 0 and with cells whose centre crosses it. The mesh starts
+    on [0, 100 + headroom] so it still covers the upper tail once the flow has moved it down;
+    mass above 100 is put back at 100, like the clip in rk4_step_soc.
+
+    Returns a dict with the step times, survival P(SOC > 0), TTE density, mean TTE, and at n_out
+    output times the density on soc_axis and the SOC quantiles (absorbed paths count as SOC 0,
+    like the Monte Carlo paths).
+    """
+    t_end = sf.T if t_end is None else t_end
+    soc_axis = np.linspace(0, 100, 501) if soc_axis is None else soc_axis
+    slope, intercept = linear_drift_coefficients()
+    offset = intercept / slope  # flow: SOC(t) + offset = (SOC(0) + offset) * exp(slope * t)
+    dt = t_end / n_steps
+
+    edges0 = np.linspace(0, 100 + headroom, n_cells + 1)
+    mass = np.zeros(n_cells)
+    mass[min(np.searchsorted(edges0, initial_soc, side='right') - 1, n_cells - 1)] = 1.0
+    absorbed = 0.0
+
+    times = np.linspace(0, t_end, n_steps + 1)
+    survival = np.ones(n_steps + 1)
+    out_steps = np.unique(np.linspace(0, n_steps, n_out).astype(int))
+    density = np.zeros((len(out_steps), len(soc_axis)))
+    soc_quantiles = {q: np.zeros(len(out_steps)) for q in quantiles}
+
+    def record(k, edges, first):
+        centres = 0.5 * (edges[first:-1] + edges[first + 1:])
+        h = edges[1] - edges[0]
+        density[k] = np.interp(soc_axis, np.concatenate(([0.0], centres)),
+                               np.concatenate(([0.0], mass[first:] / h)), right=0.0)
+        cdf = absorbed + np.cumsum(mass[first:])
+        for q in quantiles:
+            soc_quantiles[q][k] = 0.0 if q <= absorbed else np.interp(q, cdf, edges[first + 1:])
+
+    first = 0
+    k_out = 0
+    if out_steps[0] == 0:
+        record(0, edges0, 0)
+        k_out = 1
+    for step in range(1, n_steps + 1):
+        edges = (edges0 + offset) * np.exp(slope * times[step]) - offset
+        h = edges[1] - edges[0]
+        centres = 0.5 * (edges[:-1] + edges[1:])
+
+        # Cells carried across SOC = 0 by the flow are absorbed whole
+        crossed = np.searchsorted(centres, 0.0, side='right')
+        if crossed >= n_cells:
+            absorbed += mass[first:].sum()
+            mass[:] = 0.0
+            survival[step:] = 1.0 - absorbed
+            break
+        if crossed > first:
+            absorbed += mass[first:crossed].sum()
+            mass[first:crossed] = 0.0
+            first = crossed
+
+        # Backward Euler for dm/dt = d^2(D p)/dx^2 on the active cells (p = m / h)
+        D = 0.5 * sf.diffusion_soc(centres[first:])**2
+        r = dt * D / h**2
+        bands = np.zeros((3, n_cells - first))
+        bands[0, 1:] = -r[1:]
+        bands[2, :-1] = -r[:-1]
+        bands[1] = 1 + 2 * r
+        bands[1, -1] = 1 + r[-1]  # zero flux at the top of the mesh
+        boundary_rate = dt * D[0] / (h * centres[first])  # Dirichlet p = 0 at SOC = 0
+        bands[1, 0] = 1 + r[0] + boundary_rate
+        mass[first:] = solve_banded((1, 1), bands, mass[first:])
+        absorbed += boundary_rate * mass[first]
+        above = np.searchsorted(centres, 100.0, side='right')
+        if above < n_cells:
+            mass[above - 1] += mass[above:].sum()
+            mass[above:] = 0.0
+        survival[step] = 1.0 - absorbed
+
+        if k_out < len(out_steps) and step == out_steps[k_out]:
+            record(k_out, edges, first)
+            k_out += 1
+
+    tte_density = np.gradient(-survival, times)
+    return {
+        'time': times,
+        'survival': survival,
+        'tte_density': tte_density,
+        'mean_tte': np.sum(0.5 * (times[1:] + times[:-1]) * -np.diff(survival)),
+        'out_time': times[out_steps],
+        'soc': soc_axis,
+        'density': density,
+        'quantiles': soc_quantiles,
+    }
+
+def monte_carlo_ensemble(n_paths, initial_soc=100.0, n_steps=None, t_end=None, seed=None, out_times=None,
+                         quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    """
+    Vectorized SOC Monte Carlo with the rk4_step_soc scheme (paths stop at SOC 0, like
+    monteCarloSim.run_sim). Returns empty times (inf if never empty) and SOC quantiles at out_times.
+    """
+    rng = np.random.default_rng(seed)
+    t_end = sf.T if t_end is None else t_end
+    n_steps = sf.N if n_steps is None else n_steps
+    dt = t_end / n_steps
+    out_idx = (np.zeros(0, dtype=int) if out_times is None
+               else np.rint(np.asarray(out_times) / dt).astype(int))
+
+    soc = np.full(n_paths, float(initial_soc))
+    empty_time = np.full(n_paths, np.inf)
+    soc_quantiles = {q: np.zeros(len(out_idx)) for q in quantiles}
+    for step in range(n_steps + 1):
+        for k in np.flatnonzero(out_idx == step):
+            for q in quantiles:
+                soc_quantiles[q][k] = np.quantile(soc, q)
+        if step == n_steps:
+            break
+        alive = np.isinf(empty_time)
+        soc_new, _ = sf.rk4_step_soc(soc[alive], step * dt, dt, rng.normal(0, np.sqrt(dt), alive.sum()))
+        soc[alive] = soc_new
+        emptied = np.flatnonzero(alive)[soc_new <= 0]
+        empty_time[emptied] = (step + 1) * dt
+        soc[emptied] = 0.0
+    return {'empty_time': empty_time, 'quantiles': soc_quantiles}
+
+def cross_validate(n_paths=2000, seed=0, **fp_kwargs):
+    """Compare the Fokker-Planck survival curve and SOC quantiles with a Monte Carlo ensemble."""
+    fp = solve_fokker_planck(**fp_kwargs)
+    mc = monte_carlo_ensemble(n_paths, fp_kwargs.get('initial_soc', 100.0), t_end=fp['time'][-1],
+                              seed=seed, out_times=fp['out_time'], quantiles=tuple(fp['quantiles']))
+    mc_survival = 1.0 - np.searchsorted(np.sort(mc['empty_time']), fp['time'], side='right') / n_paths
+    finite = np.isfinite(mc['empty_time'])
+    return {
+        'survival_ks': np.max(np.abs(mc_survival - fp['survival'])),
+        'mean_tte': (fp['mean_tte'], mc['empty_time'][finite].mean() if finite.any() else np.nan),
+        'quantile_error': {q: np.max(np.abs(fp['quantiles'][q] - mc['quantiles'][q])) for q in fp['quantiles']},
+        'fokker_planck': fp,
+        'monte_carlo': mc,
+    }
+
+if __name__ == "__main__":
+    import time
+
+    start = time.time()
+    fp = solve_fokker_planck()
+    fp_time = time.time() - start
+    start = time.time()
+    check = cross_validate(n_paths=2000)
+    print(f"Fokker-Planck: {fp_time:.2f} s, mean TTE {fp['mean_tte']:.4f} h; "
+          f"Monte Carlo (2000 paths): {time.time() - start - fp_time:.1f} s, mean TTE {check['mean_tte'][1]:.4f} h")
+    print(f"Survival curve KS distance {check['survival_ks']:.4f}; max SOC quantile error (%): "
+          + ", ".join(f"q{q:g} {err:.3f}" for q, err in check['quantile_error'].items()))
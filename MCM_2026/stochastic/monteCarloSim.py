@@ -1,9 +1,21 @@
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
+
+import repo_root  # puts the repo root on sys.path for the shared modules
+import instrument
+import kernel_backend
+from checkpoint import DEFAULT_CHECKPOINT_DIR, Checkpointer
+from sim_cache import SimCache, cache_key, code_version
+
 import stochastic_full as sf
+from density_plot import PathDensity
 
 
 num_simulations = 100
+SEED = 42
+RNG_BLOCK = 4096  # increments drawn at a time by the compiled kernel
 N = 50000  # number of time steps
 T = sf.totalBatteryLife * 1.2
 dt = T / N
@@ -12,29 +24,77 @@ timeInHours = np.linspace(0, T, N)
 def run_sim(initial_soc, capacity_health, power_params):
     soc_path = np.zeros(N)
     soc_path[0] = initial_soc
+    if kernel_backend.active():
+        return _run_sim_compiled(soc_path)
     
     for i in range(1, N):
         soc_new, _ = sf.rk4_step_soc(soc_path[i-1], timeInHours[i-1], dt)
         soc_path[i] = soc_new
         if soc_new <= 0:  # Stop simulation when SOC reaches 0
             soc_path[i:] = 0
+            instrument.count("sde.depleted_paths")
             break
     
     return soc_path
 
-def run_monte_carlo(num_simulations, initial_soc, capacity_health, power_params):
-    """Run multiple Monte Carlo simulations"""
-    paths = np.zeros((num_simulations, N))
-    for k in range(num_simulations):
-        paths[k, :] = run_sim(initial_soc, capacity_health, power_params)
-    return paths
+def _run_sim_compiled(soc_path):
+    """
+    run_sim with the compiled rk4 recursion. Increments are drawn from np.random in blocks (the
+    same values the per-step draws would give); when the path empties inside a block the
+    generator is rewound and advanced by only the draws used, so later paths match too.
+    """
+    scale = np.sqrt(dt)
+    i = 0
+    while i < N - 1:
+        block = min(RNG_BLOCK, N - 1 - i)
+        rng_state = np.random.get_state()
+        used = sf.rk4_soc_steps(soc_path, i, np.random.normal(0, scale, block), dt, sf.batteryDrainConstant)
+        if used < block:
+            np.random.set_state(rng_state)
+            np.random.normal(0, scale, used)
+            instrument.count("sde.depleted_paths")
+            break
+        i += block
+    return soc_path
+
+def run_monte_carlo(num_simulations, initial_soc, capacity_health, power_params, density=None, checkpoint=None):
+    """
+    Run multiple Monte Carlo simulations.
+    With a PathDensity, paths are binned as they finish and only the density is returned.
+    With a checkpoint.Checkpointer, the finished paths (or the density) and the np.random state
+    are saved between paths and an interrupted run resumes where it stopped, bit-identically.
+    """
+    aggregate = density if density is not None else np.zeros((num_simulations, N))
+    start = 0
+    if checkpoint is not None:
+        saved = checkpoint.load()
+        if saved is not None:
+            start, aggregate = saved["next_path"], saved["aggregate"]
+            np.random.set_state(saved["np_random"])
+            print(f"Resuming Monte Carlo at path {start}/{num_simulations}")
+
+    for k in range(start, num_simulations):
+        with instrument.stage("sde.monte_carlo_path", work=N):
+            soc_path = run_sim(initial_soc, capacity_health, power_params)
+        if density is not None:
+            aggregate.add(timeInHours, soc_path)
+        else:
+            aggregate[k, :] = soc_path
+        if checkpoint is not None:
+            checkpoint.maybe_save(lambda: {"next_path": k + 1, "aggregate": aggregate,
+                                           "np_random": np.random.get_state()})
+    if checkpoint is not None:
+        checkpoint.done()
+    return aggregate
 
 def plot_monte_carlo_results(paths):
-    """Plot all simulated SOC paths"""
+    """Plot the simulated SOC paths (array or PathDensity) as a density image with quantiles"""
     plt.figure(figsize=(12, 6))
-    # Plot each simulation path with low alpha for transparency
-    for i in range(paths.shape[0]):
-        plt.plot(timeInHours, paths[i], alpha=0.05, color='orange')
+    density = paths
+    if not isinstance(paths, PathDensity):
+        density = PathDensity(T)
+        density.add(timeInHours, paths)
+    density.plot()
     
     plt.title("Monte Carlo Simulation: SOC Diffusion Paths")
     plt.xlabel("Time (two years)")
@@ -44,6 +104,29 @@ def plot_monte_carlo_results(paths):
     plt.grid(True, alpha=0.3)
     plt.show()
 
-# Run simulation and plot
-paths = run_monte_carlo(num_simulations, 100, 1.0, {})
-plot_monte_carlo_results(paths)
\ No newline at end of file
+def cached_monte_carlo(num_simulations, initial_soc, capacity_health, power_params, seed=SEED):
+    """
+    run_monte_carlo through the shared result cache (paths are memory-mapped on reuse).
+    A run that is interrupted before reaching the cache resumes from its checkpoint.
+    """
+    params = {"num_simulations": num_simulations, "initial_soc": initial_soc, "capacity_health": capacity_health,
+              "power_params": power_params, "T": T, "N": N, "batteryDrainConstant": sf.batteryDrainConstant}
+    version = code_version(__file__, sf.__file__)
+
+    def compute():
+        np.random.seed(seed)
+        checkpoint = Checkpointer(os.path.join(DEFAULT_CHECKPOINT_DIR, "soc_monte_carlo.pkl"),
+                                  key=cache_key("soc_monte_carlo", params, seed, "rk4", version))
+        return {"paths": run_monte_carlo(num_simulations, initial_soc, capacity_health, power_params,
+                                         checkpoint=checkpoint)}
+
+    return SimCache().cached("soc_monte_carlo", compute, params, seed=seed, scheme="rk4",
+                             version=version, mmap=True)["paths"]
+
+instrument.register("sde", sys.modules[__name__], "run_sim")
+instrument.register("plot", sys.modules[__name__], "plot_monte_carlo_results")
+
+if __name__ == "__main__":
+    # Run simulation (or reuse a cached ensemble) and plot
+    paths = cached_monte_carlo(num_simulations, 100, 1.0, {})
+    plot_monte_carlo_results(paths)
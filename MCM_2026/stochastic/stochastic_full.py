@@ -1,6 +1,11 @@
+import sys
 import matplotlib.pyplot as plt
 import numpy as np
 
+import repo_root  # puts the repo root on sys.path for the shared modules
+import instrument
+import kernel_backend
+
 # Battery drain constant
 def get_battery_drain(voltageUse=4.5, batteryHistory=0.5):
     voltageCoeff=0.1
@@ -9,15 +14,19 @@ def get_battery_drain(voltageUse=4.5, batteryHistory=0.5):
 
 batteryDrainConstant = get_battery_drain()
 
+# SOC model constants, shared by drift_soc/diffusion_soc and the compiled rk4_soc_steps kernel
+SOC_DRAIN_OFFSET = 154.149408254
+SOC_NOISE = 0.25
+SOC_NOISE_FLOOR = 0.01
+
 def drift_soc(SOC):
-    return -batteryDrainConstant * (SOC + 154.149408254) # differentiate earlier
+    return -batteryDrainConstant * (SOC + SOC_DRAIN_OFFSET) # differentiate earlier
 
 def diffusion_soc(SOC):
-    noise_level = 0.25
-    return noise_level * np.sqrt(np.maximum(SOC, 0.01)) #proportional according to gaussian
+    return SOC_NOISE * np.sqrt(np.maximum(SOC, SOC_NOISE_FLOOR)) #proportional according to gaussian
 
 def drift_tte(SOC, TTE):
-    theoretical_tte = np.log((SOC + 154.149408254) / 154.149408254) / batteryDrainConstant # substantial correlaiton to the theoretical
+    theoretical_tte = np.log((SOC + SOC_DRAIN_OFFSET) / SOC_DRAIN_OFFSET) / batteryDrainConstant # substantial correlaiton to the theoretical
     mean_reversion = 0.5  # elasticity
     return -mean_reversion * (TTE - theoretical_tte)
 
@@ -25,7 +34,7 @@ def diffusion_tte(SOC):
     noise_level = 0.15 # lower than before
     return noise_level * np.sqrt(np.maximum(SOC / 100, 0.01))
 
-totalBatteryLife = np.log(254.149408254 / 154.149408254) / batteryDrainConstant
+totalBatteryLife = np.log((100 + SOC_DRAIN_OFFSET) / SOC_DRAIN_OFFSET) / batteryDrainConstant
 
 # Time discretization for sde solver and rk4
 T = totalBatteryLife * 1.2
@@ -34,10 +43,12 @@ dt = T / N
 timeInHours = np.linspace(0, T, N)
 
 # runge kutts
-def rk4_step_soc(SOC, t, dt):
+def rk4_step_soc(SOC, t, dt, dW=None):
+    # dW can be passed in (e.g. one increment per path for a vectorized ensemble)
     k1_drift = drift_soc(SOC)
     k1_diff = diffusion_soc(SOC)
-    dW = np.random.normal(0, np.sqrt(dt))
+    if dW is None:
+        dW = np.random.normal(0, np.sqrt(dt))
     
     k2_drift = drift_soc(SOC + 0.5*k1_drift*dt)
     k2_diff = diffusion_soc(SOC + 0.5*k1_diff*dW*0.5)
@@ -53,6 +64,33 @@ def rk4_step_soc(SOC, t, dt):
     SOC_new = SOC + drift_avg * dt + diff_avg * dW
     return np.clip(SOC_new, 0, 100), dW
 
+@kernel_backend.jit
+def rk4_soc_steps(soc_path, start, dW, dt, drain_constant):
+    """
+    Compiled rk4_step_soc recursion (same operations in the same order): fills soc_path[start + 1:]
+    from soc_path[start] with one increment of dW per step, stopping once SOC reaches 0.
+    Returns the number of increments used. The model constants are read at compile time; Numba's
+    disk cache is invalidated when this file changes.
+    """
+    soc = soc_path[start]
+    for j in range(len(dW)):
+        dw = dW[j]
+        k1_drift = -drain_constant * (soc + SOC_DRAIN_OFFSET)
+        k1_diff = SOC_NOISE * np.sqrt(max(soc, SOC_NOISE_FLOOR))
+        k2_drift = -drain_constant * ((soc + 0.5*k1_drift*dt) + SOC_DRAIN_OFFSET)
+        k2_diff = SOC_NOISE * np.sqrt(max(soc + 0.5*k1_diff*dw*0.5, SOC_NOISE_FLOOR))
+        k3_drift = -drain_constant * ((soc + 0.5*k2_drift*dt) + SOC_DRAIN_OFFSET)
+        k3_diff = SOC_NOISE * np.sqrt(max(soc + 0.5*k2_diff*dw*0.5, SOC_NOISE_FLOOR))
+        k4_drift = -drain_constant * ((soc + k3_drift*dt) + SOC_DRAIN_OFFSET)
+        k4_diff = SOC_NOISE * np.sqrt(max(soc + k3_diff*dw, SOC_NOISE_FLOOR))
+        drift_avg = (k1_drift + 2*k2_drift + 2*k3_drift + k4_drift) / 6
+        diff_avg = (k1_diff + 2*k2_diff + 2*k3_diff + k4_diff) / 6
+        soc = min(max(soc + drift_avg * dt + diff_avg * dw, 0.0), 100.0)
+        soc_path[start + j + 1] = soc
+        if soc <= 0:
+            return j + 1
+    return len(dW)
+
 def rk4_step_tte(SOC, TTE, t, dt, dW):
     #on some same shit as before
     k1_drift = drift_tte(SOC, TTE)
@@ -73,62 +111,58 @@ def rk4_step_tte(SOC, TTE, t, dt, dW):
     TTE_new = TTE + drift_avg * dt + diff_avg * dW
     return np.clip(TTE_new, 0, totalBatteryLife * 1.2)
 
-# plot some shit
-SOC = np.zeros(N)
-SOC[0] = 100
-
-for i in range(1, N):
-    SOC[i], _ = rk4_step_soc(SOC[i-1], timeInHours[i-1], dt)
-
-# Deterministic SOC for comparison
-SOC_deterministic = 254.149408254 * np.exp(-batteryDrainConstant * timeInHours) - 150
-
-# SOC & TTE
-stateOfChargeAxis = np.linspace(0, 100, 1000)
-
-# Use coupled RK4 for accurate TTE trajectory
-SOC_path = np.linspace(100, 0.5, 5000)
-TTE_path = np.zeros(5000)
-TTE_path[0] = totalBatteryLife
-
-dt_soc = 100 / 5000  # SOC step 
-for i in range(1, 5000):
-    SOC_curr = SOC_path[i-1]
-    TTE_curr = TTE_path[i-1]
-    dW_local = np.random.normal(0, 1) 
-    
-    TTE_path[i] = rk4_step_tte(SOC_curr, TTE_curr, 0, dt_soc, dW_local * np.sqrt(dt_soc))
-
-time_to_empty_stochastic = np.interp(stateOfChargeAxis, SOC_path[::-1], TTE_path[::-1])
-time_to_empty_deterministic = np.log((stateOfChargeAxis + 154.149408254) / 154.149408254) / batteryDrainConstant
-
-# for reproducibility
-np.random.seed(42)
-fig = plt.figure(figsize=(12, 9))
-
-# Plot 1: SOC vs Time
-plt.subplot(211)
-plt.title("SOC vs TTE")
-plt.xlabel("Time (hours)")
-plt.ylabel("State of Charge (%)")
-plt.xlim([0, totalBatteryLife * 1.1])
-plt.ylim([0, 105])
-plt.grid(True, alpha=0.3)
-plt.plot(timeInHours, SOC_deterministic)
-plt.plot(timeInHours, SOC)
-
-# Plot 2nd
-plt.subplot(212)
-plt.title("TTE vs SOC")
-plt.xlabel("State of Charge (%)")
-plt.ylabel("Time to Empty (hours)")
-plt.xlim([0, 100])
-plt.ylim([0, totalBatteryLife * 1.15])
-plt.grid(True, alpha=0.3)
-plt.plot(stateOfChargeAxis, time_to_empty_deterministic)
-plt.plot(stateOfChargeAxis, time_to_empty_stochastic)
-plt.legend(fontsize=10)
-
-plt.tight_layout()
-plt.savefig("battery_stochastic_curve.png", dpi=300)
-plt.show()
\ No newline at end of file
+# Probes for instrument.enable(["sde"]): per-call timing of the drift/diffusion terms and RK4 steps
+instrument.register("sde", sys.modules[__name__], "drift_soc", "diffusion_soc", "drift_tte", "diffusion_tte",
+                    "rk4_step_soc", "rk4_step_tte")
+
+if __name__ == "__main__":
+    import coupled_ensemble
+    from sim_cache import SimCache, code_version
+
+    # plot some shit
+    # One coupled path: SOC and TTE advance together in time on the same Brownian increments
+    path = SimCache().cached(
+        "soc_tte_path", lambda: coupled_ensemble.simulate_soc_tte(1, t_end=T, n_steps=N, n_out=N, seed=42),
+        params={"T": T, "N": N, "batteryDrainConstant": batteryDrainConstant}, seed=42, scheme="rk4",
+        version=code_version(__file__, coupled_ensemble.__file__))
+    pathTime = path['out_time']
+    SOC = path['soc'][:, 0]
+    running = pathTime < path['empty_time'][0]
+    SOC_path = SOC[running]
+    TTE_path = path['tte'][running, 0]
+
+    # Deterministic SOC for comparison
+    SOC_deterministic = 254.149408254 * np.exp(-batteryDrainConstant * timeInHours) - 150
+
+    # SOC & TTE
+    stateOfChargeAxis = np.linspace(0, 100, 1000)
+    time_to_empty_deterministic = np.log((stateOfChargeAxis + 154.149408254) / 154.149408254) / batteryDrainConstant
+
+    fig = plt.figure(figsize=(12, 9))
+
+    # Plot 1: SOC vs Time
+    plt.subplot(211)
+    plt.title("SOC vs TTE")
+    plt.xlabel("Time (hours)")
+    plt.ylabel("State of Charge (%)")
+    plt.xlim([0, totalBatteryLife * 1.1])
+    plt.ylim([0, 105])
+    plt.grid(True, alpha=0.3)
+    plt.plot(timeInHours, SOC_deterministic)
+    plt.plot(pathTime, SOC)
+
+    # Plot 2nd
+    plt.subplot(212)
+    plt.title("TTE vs SOC")
+    plt.xlabel("State of Charge (%)")
+    plt.ylabel("Time to Empty (hours)")
+    plt.xlim([0, 100])
+    plt.ylim([0, totalBatteryLife * 1.15])
+    plt.grid(True, alpha=0.3)
+    plt.plot(stateOfChargeAxis, time_to_empty_deterministic)
+    plt.plot(SOC_path, TTE_path)
+    plt.legend(fontsize=10)
+
+    plt.tight_layout()
+    plt.savefig("battery_stochastic_curve.png", dpi=300)
+    plt.show()
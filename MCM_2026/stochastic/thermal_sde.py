@@ -0,0 +1,99 @@
+import numpy as np
+import stochastic_full as sf
+
+# State vector per path: [SOC (%), cell temperature (deg C), capacity health (fraction)]
+SOC, TEMP, HEALTH = 0, 1, 2
+STATE_NAMES = ('SOC', 'temperature', 'health')
+
+T_REF = 25.0          # temperature of the nominal drain rate (deg C)
+TEMP_DRAIN = 5e-4     # relative extra drain per deg C^2 away from T_REF (cold and heat both cost)
+THERMAL_TAU = 0.5     # cell-to-ambient thermal time constant (h)
+HEAT_GAIN = 0.1       # deg C per % SOC drained
+FADE_RATE = 2e-4      # health lost per full (100 %) discharge at T_REF
+FADE_DOUBLING = 10.0  # fade rate doubles every this many deg C
+NOISE = np.array([sf.SOC_NOISE, 0.5, 1e-4])  # SOC (x sqrt(SOC)), temperature, health (x health)
+# Noise correlation between the SOC, temperature and health increments
+CORRELATION = np.array([
+    [1.0, -0.3, 0.1],
+    [-0.3, 1.0, -0.2],
+    [0.1, -0.2, 1.0],
+])
+
+def drain_rate(state):
+    """State-dependent drain: nominal batteryDrainConstant, raised off T_REF and as health fades."""
+    temp_factor = 1.0 + TEMP_DRAIN * (state[:, TEMP] - T_REF)**2
+    return sf.batteryDrainConstant * temp_factor / np.maximum(state[:, HEALTH], 0.05)
+
+def drift(state, ambient):
+    """(paths x 3) drift of all states."""
+    soc_rate = -drain_rate(state) * (state[:, SOC] + sf.SOC_DRAIN_OFFSET)  # same shape as drift_soc
+    out = np.empty_like(state)
+    out[:, SOC] = soc_rate
+    out[:, TEMP] = -(state[:, TEMP] - ambient) / THERMAL_TAU - HEAT_GAIN * soc_rate
+    out[:, HEALTH] = FADE_RATE * 2.0**((state[:, TEMP] - T_REF) / FADE_DOUBLING) * soc_rate / 100.0
+    return out
+
+def diffusion(state):
+    """(paths x 3) per-state noise amplitudes (diagonal of the diffusion before correlation)."""
+    out = np.empty_like(state)
+    out[:, SOC] = NOISE[SOC] * np.sqrt(np.maximum(state[:, SOC], sf.SOC_NOISE_FLOOR))
+    out[:, TEMP] = NOISE[TEMP]
+    out[:, HEALTH] = NOISE[HEALTH] * state[:, HEALTH]
+    return out
+
+def simulate_thermal(n_paths, initial_soc=100.0, ambient=25.0, initial_temp=None, initial_health=1.0,
+                     t_end=None, n_steps=5000, n_out=200, correlation=CORRELATION, seed=None):
+    """
+    Batched Euler-Maruyama for the (SOC, temperature, health) system over n_paths paths.
+    Correlated increments are Z @ L.T with L the Cholesky factor of correlation, so each step
+    is a handful of (paths x states) array operations whatever the number of states. ambient may
+    be a scalar or one temperature per path. Paths stop when SOC reaches 0.
+    Returns the output times, (n_out x n_paths x 3) state snapshots and the empty times.
+    """
+    rng = np.random.default_rng(seed)
+    t_end = sf.T if t_end is None else t_end
+    dt = t_end / n_steps
+    cholesky = np.linalg.cholesky(correlation)
+    ambient = np.broadcast_to(np.asarray(ambient, dtype=float), (n_paths,))
+    out_steps = np.unique(np.linspace(0, n_steps, n_out).astype(int))
+
+    state = np.empty((n_paths, 3))
+    state[:, SOC] = initial_soc
+    state[:, TEMP] = ambient if initial_temp is None else initial_temp
+    state[:, HEALTH] = initial_health
+    empty_time = np.full(n_paths, np.inf)
+    states_out = np.empty((len(out_steps), n_paths, 3))
+    k_out = 0
+    for step in range(n_steps + 1):
+        if step == out_steps[k_out]:
+            states_out[k_out] = state
+            k_out += 1
+        if step == n_steps:
+            break
+        alive = np.flatnonzero(np.isinf(empty_time))
+        if len(alive) == 0:
+            states_out[k_out:] = state
+            break
+        x = state[alive]
+        dW = rng.standard_normal((len(alive), 3)) @ cholesky.T * np.sqrt(dt)
+        x = x + drift(x, ambient[alive]) * dt + diffusion(x) * dW
+        x[:, SOC] = np.minimum(x[:, SOC], 100.0)
+        x[:, HEALTH] = np.clip(x[:, HEALTH], 0.0, 1.0)
+        emptied = x[:, SOC] <= 0
+        x[emptied, SOC] = 0.0
+        empty_time[alive[emptied]] = (step + 1) * dt
+        state[alive] = x
+
+    return {'out_time': out_steps * dt, 'states': states_out, 'empty_time': empty_time}
+
+if __name__ == "__main__":
+    import time
+
+    for ambient in (0.0, 25.0, 40.0):
+        start = time.time()
+        result = simulate_thermal(10000, ambient=ambient, t_end=1.5, seed=0)
+        final = result['states'][-1]
+        print(f"ambient {ambient:4.1f} C: 10000 paths in {time.time() - start:.1f} s; "
+              f"empty after {np.mean(result['empty_time']):.3f} +/- {np.std(result['empty_time']):.3f} h, "
+              f"peak cell temp {result['states'][:, :, TEMP].max():.1f} C, "
+              f"health {final[:, HEALTH].mean():.5f}")
@@ -0,0 +1,144 @@
+import os
+import xml.etree.ElementTree as ET
+from array import array
+
+import numpy as np
+import track
+
+EARTH_RADIUS = 6371000.0
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def read_gpx(path):
+    """Stream track/route points from a GPX file. Returns (lat, lon, ele) arrays."""
+    lat, lon, ele = array('d'), array('d'), array('d')
+    current_ele = np.nan
+    for event, elem in ET.iterparse(path, events=('end',)):
+        name = _local_name(elem.tag)
+        if name == 'ele':
+            current_ele = float(elem.text)
+        elif name in ('trkpt', 'rtept'):
+            lat.append(float(elem.get('lat')))
+            lon.append(float(elem.get('lon')))
+            ele.append(current_ele)
+            current_ele = np.nan
+            elem.clear()
+        elif name == 'wpt':
+            current_ele = np.nan
+    return np.frombuffer(lat), np.frombuffer(lon), np.frombuffer(ele)
+
+def read_tcx(path):
+    """Stream trackpoints from a TCX file. Returns (lat, lon, ele) arrays."""
+    lat, lon, ele = array('d'), array('d'), array('d')
+    fields = {}
+    for event, elem in ET.iterparse(path, events=('end',)):
+        name = _local_name(elem.tag)
+        if name in ('LatitudeDegrees', 'LongitudeDegrees', 'AltitudeMeters'):
+            fields[name] = float(elem.text)
+        elif name == 'Trackpoint':
+            # Trackpoints without a position (e.g. paused sensors) are skipped
+            if 'LatitudeDegrees' in fields and 'LongitudeDegrees' in fields:
+                lat.append(fields['LatitudeDegrees'])
+                lon.append(fields['LongitudeDegrees'])
+                ele.append(fields.get('AltitudeMeters', np.nan))
+            fields = {}
+            elem.clear()
+    return np.frombuffer(lat), np.frombuffer(lon), np.frombuffer(ele)
+
+def read_csv_profile(path, delimiter=','):
+    """
+    Read a CSV course with a header row. Supported column sets:
+    lat/lon/ele, x/y/z (metres) or distance/elevation (straight course).
+    Returns (x, y, z) arrays in metres.
+    """
+    with open(path) as f:
+        header = [h.strip().lower() for h in f.readline().split(delimiter)]
+    data = np.loadtxt(path, delimiter=delimiter, skiprows=1, ndmin=2)
+    cols = {name: data[:, i] for i, name in enumerate(header)}
+
+    def pick(*names):
+        for name in names:
+            if name in cols:
+                return cols[name]
+        return None
+
+    lat, lon = pick('lat', 'latitude'), pick('lon', 'lng', 'longitude')
+    ele = pick('ele', 'elevation', 'altitude', 'z')
+    if lat is not None and lon is not None:
+        return project_to_plane(lat, lon, ele)
+    if pick('x') is not None and pick('y') is not None:
+        return pick('x'), pick('y'), ele if ele is not None else np.zeros(len(data))
+    distance = pick('distance', 'dist', 's')
+    if distance is not None and ele is not None:
+        return distance, np.zeros(len(distance)), ele
+    raise ValueError(f"Unrecognised CSV columns {header}")
+
+def project_to_plane(lat, lon, ele=None):
+    """Equirectangular projection of lat/lon (degrees) to metres around the first point."""
+    lat0 = np.radians(lat[0])
+    x = EARTH_RADIUS * np.radians(lon - lon[0]) * np.cos(lat0)
+    y = EARTH_RADIUS * np.radians(lat - lat[0])
+    if ele is None:
+        z = np.zeros(len(lat))
+    else:
+        # Fill missing elevations by interpolating along the point index
+        z = np.asarray(ele, dtype=float)
+        missing = np.isnan(z)
+        if missing.all():
+            z = np.zeros(len(lat))
+        elif missing.any():
+            idx = np.arange(len(z))
+            z = np.interp(idx, idx[~missing], z[~missing])
+    return x, y, z
+
+def track_from_profile(x, y, z, resample=None, smooth=None, roughness=0.5):
+    """
+    Convert a polyline (metres) into an array-backed Track.
+    resample: optional uniform segment length in metres.
+    smooth: optional moving-average window (points) applied to x, y and z.
+    """
+    x, y, z = (np.asarray(v, dtype=float) for v in (x, y, z))
+
+    # Drop repeated points (zero-length segments) which GPS logs contain when stationary
+    keep = np.concatenate(([True], np.hypot(np.diff(x), np.diff(y)) > 1e-6))
+    x, y, z = x[keep], y[keep], z[keep]
+    if len(x) < 3:
+        raise ValueError("A course needs at least 3 distinct points")
+
+    if resample:
+        s = np.concatenate(([0.0], np.cumsum(np.hypot(np.diff(x), np.diff(y)))))
+        s_new = np.append(np.arange(0.0, s[-1], resample), s[-1])
+        x, y, z = np.interp(s_new, s, x), np.interp(s_new, s, y), np.interp(s_new, s, z)
+
+    if smooth:
+        x, y, z = (track._smooth_array(v, smooth) for v in (x, y, z))
+
+    dx, dy, dz = np.diff(x), np.diff(y), np.diff(z)
+    segment_length = np.hypot(dx, dy)
+    headings = np.arctan2(dy, dx)
+    turning_angle = np.zeros(len(segment_length))
+    turning_angle[1:] = (np.diff(headings) + np.pi) % (2 * np.pi) - np.pi
+
+    return track.Track.from_arrays({
+        'x': x[1:] - x[0],
+        'y': y[1:] - y[0],
+        'z': z[1:] - z[0],
+        'segment_length': segment_length,
+        'slope': dz / segment_length,
+        'turning_angle': turning_angle,
+        'roughness': np.full(len(segment_length), roughness),
+    })
+
+def load_course(path, resample=None, smooth=None, roughness=0.5):
+    """Load a GPX, TCX or CSV course file into a Track."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.gpx':
+        x, y, z = project_to_plane(*read_gpx(path))
+    elif ext == '.tcx':
+        x, y, z = project_to_plane(*read_tcx(path))
+    elif ext in ('.csv', '.txt'):
+        x, y, z = read_csv_profile(path)
+    else:
+        raise ValueError(f"Unsupported course format: {ext}")
+    return track_from_profile(x, y, z, resample=resample, smooth=smooth, roughness=roughness)
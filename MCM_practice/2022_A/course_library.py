@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, asdict
+from multiprocessing import Pool
+
+import numpy as np
+import track
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "course_cache")
+
+@dataclass(frozen=True)
+class CourseConstraints:
+    min_sharp_turns: int = 4
+    sharp_angle: float = 0.08  # radians
+    max_net_angle: float = 1.0  # radians
+    max_attempts: int = 50
+
+def course_key(seed, n_points, total_length, constraints):
+    """Stable cache key for (seed, n_points, length, constraints)."""
+    payload = json.dumps({
+        "seed": int(seed),
+        "n_points": int(n_points),
+        "total_length": float(total_length),
+        "constraints": asdict(constraints),
+    }, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+def _sample_course(args):
+    seed, n_points, total_length, constraints = args
+    rng = np.random.default_rng(seed)
+    arrays, attempts = track.sample_track_arrays(
+        rng, n_points, total_length,
+        min_sharp_turns=constraints.min_sharp_turns,
+        sharp_angle=constraints.sharp_angle,
+        max_net_angle=constraints.max_net_angle,
+        max_attempts=constraints.max_attempts,
+    )
+    return seed, arrays, attempts
+
+class CourseLibrary:
+    """
+    On-disk library of closed courses generated by rejection sampling.
+    Each course is stored as one .npz file keyed by (seed, n_points, length, constraints);
+    seeds that exhaust max_attempts are cached as rejections so they are not retried.
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, constraints=None):
+        self.cache_dir = cache_dir
+        self.constraints = constraints or CourseConstraints()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, seed, n_points, total_length):
+        key = course_key(seed, n_points, total_length, self.constraints)
+        return os.path.join(self.cache_dir, f"course_{key}.npz")
+
+    def _load(self, path):
+        with np.load(path) as data:
+            if not data["accepted"]:
+                return None, int(data["attempts"])
+            arrays = {name: data[name] for name in data.files if name not in ("accepted", "attempts")}
+            return arrays, int(data["attempts"])
+
+    def _store(self, path, arrays, attempts):
+        tmp_path = path + ".tmp.npz"
+        if arrays is None:
+            np.savez_compressed(tmp_path, accepted=False, attempts=attempts)
+        else:
+            np.savez_compressed(tmp_path, accepted=True, attempts=attempts, **arrays)
+        os.replace(tmp_path, path)
+
+    def get(self, seed, n_points=1000, total_length=10000.0):
+        """Load one course from the cache, generating it first if needed."""
+        courses, _ = self.generate([seed], n_points, total_length, processes=1, verbose=False)
+        if seed not in courses:
+            raise RuntimeError(f"Seed {seed} did not satisfy the course constraints "
+                               f"within {self.constraints.max_attempts} attempts")
+        return courses[seed]
+
+    def generate(self, seeds, n_points=1000, total_length=10000.0, processes=None, verbose=True):
+        """
+        Return ({seed: Track} for accepted seeds, stats). Cached seeds are loaded from disk,
+        the rest are sampled in a process pool and written back to the cache.
+        """
+        courses = {}
+        attempts_total = 0
+        rejected = []
+        missing = []
+
+        for seed in seeds:
+            path = self.path_for(seed, n_points, total_length)
+            if os.path.exists(path):
+                arrays, attempts = self._load(path)
+                attempts_total += attempts
+                if arrays is None:
+                    rejected.append(seed)
+                else:
+                    courses[seed] = track.Track.from_arrays(arrays)
+            else:
+                missing.append(seed)
+
+        jobs = [(seed, n_points, total_length, self.constraints) for seed in missing]
+        if len(jobs) > 1 and processes != 1:
+            with Pool(processes) as pool:
+                results = pool.map(_sample_course, jobs)
+        else:
+            results = [_sample_course(job) for job in jobs]
+
+        for seed, arrays, attempts in results:
+            self._store(self.path_for(seed, n_points, total_length), arrays, attempts)
+            attempts_total += attempts
+            if arrays is None:
+                rejected.append(seed)
+            else:
+                courses[seed] = track.Track.from_arrays(arrays)
+
+        stats = {
+            "requested": len(seeds),
+            "accepted": len(courses),
+            "rejected_seeds": rejected,
+            "from_cache": len(seeds) - len(missing),
+            "attempts": attempts_total,
+            "acceptance_rate": len(courses) / attempts_total if attempts_total else 0.0,
+        }
+        if verbose:
+            print(f"Course library: {stats['accepted']}/{stats['requested']} courses accepted "
+                  f"({stats['from_cache']} from cache), "
+                  f"acceptance rate per attempt {stats['acceptance_rate']:.1%}")
+        return courses, stats
+
+if __name__ == "__main__":
+    library = CourseLibrary()
+    courses, stats = library.generate(range(32), n_points=1000, total_length=5000.0)
@@ -0,0 +1,171 @@
+from multiprocessing import Pool
+
+import numpy as np
+import power_calculator as pc
+
+def sample_conditions(n_samples, rng, cp_mean, cp_sd, w_prime_mean, w_prime_sd=None,
+                      rho_sd=0.03, cda_sd=0.01, wind_speed_sd=2.0):
+    """
+    Draw rider and weather parameters for an ensemble.
+    Wind is a per-sample (speed, direction) pair; its headwind component depends on the
+    segment heading and is resolved in evaluate_plans.
+    """
+    if w_prime_sd is None:
+        w_prime_sd = 0.1 * w_prime_mean
+    return {
+        'cp': rng.normal(cp_mean, cp_sd, n_samples),
+        'w_prime': np.maximum(rng.normal(w_prime_mean, w_prime_sd, n_samples), 0.0),
+        'rho': rng.normal(pc.RHO, rho_sd, n_samples),
+        'cda': np.maximum(rng.normal(pc.CDA, cda_sd, n_samples), 0.05),
+        'wind_speed': np.abs(rng.normal(0.0, wind_speed_sd, n_samples)),
+        'wind_direction': rng.uniform(-np.pi, np.pi, n_samples),
+    }
+
+def segment_headings(track):
+    """Heading of each segment; the course starts at the origin."""
+    x = np.concatenate(([0.0], track.arrays['x']))
+    y = np.concatenate(([0.0], track.arrays['y']))
+    return np.arctan2(np.diff(y), np.diff(x))
+
+def solve_velocity_wind(power, slope, headwind, rho, cda, crr=pc.CRR, mass=pc.MASS_SYS, iterations=60,
+                        min_speed=0.1):
+    """
+    Ground speed for P = v * (0.5*rho*CdA*(v+w)|v+w| + m*g*(sin a + Crr cos a)), all arguments
+    broadcast. Takes the largest root, like solve_velocity_array in still air: the root is kept
+    in a bracket [lo, hi] with f(lo) <= 0 < f(hi), approached by Newton steps from above and by
+    bisection whenever a step leaves the bracket (tailwinds, where v + w changes sign).
+    Speeds are floored at min_speed (stalled climbs); raises RuntimeError if the residual stays large.
+    """
+    alpha = np.arctan(slope)
+    k = 0.5 * np.asarray(rho) * cda
+    c = mass * pc.G * (np.sin(alpha) + crr * np.cos(alpha))
+    k, c, power, headwind = np.broadcast_arrays(k, c, np.asarray(power, dtype=float), headwind)
+
+    def residual(v):
+        air = v + headwind
+        f = k * v * air * np.abs(air) + c * v - power
+        df = k * (air * np.abs(air) + 2 * v * np.abs(air)) + c
+        return f, df
+
+    # For v > max(0, -w) the residual is convex, so once it is positive and increasing there it
+    # stays positive: hi is above every root
+    hi = pc.solve_velocity_array(power, slope, rho=rho, cda=cda, crr=crr, mass=mass)
+    hi = np.nan_to_num(hi, nan=0.0) + np.maximum(-headwind, 0.0) + 1.0
+    for _ in range(64):
+        f, df = residual(hi)
+        grow = (f <= 0) | (df <= 0)
+        if not grow.any():
+            break
+        hi = np.where(grow, 2 * hi, hi)
+    lo = np.zeros_like(hi)  # f(0) = -P <= 0
+
+    v = hi
+    for _ in range(iterations):
+        f, df = residual(v)
+        lo = np.where(f <= 0, v, lo)
+        hi = np.where(f > 0, v, hi)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = v - f / df
+        v_new = np.where((df > 0) & (newton > lo) & (newton < hi), newton, 0.5 * (lo + hi))
+        done = np.all(np.abs(v_new - v) <= 1e-12 * (1.0 + v))
+        v = v_new
+        if done:
+            break
+
+    f, _ = residual(v)
+    scale = np.abs(power) + np.abs(c) * v + k * v * (v + np.abs(headwind))**2 + 1.0
+    if np.any(np.abs(f) > 1e-6 * scale):
+        raise RuntimeError(f"Wind speed solve did not converge: max residual {np.max(np.abs(f)):.3g} W")
+    return np.maximum(v, min_speed)
+
+def evaluate_plans(track, plans, conditions):
+    """
+    Ride every plan (n_plans x n_segments powers) under every sampled condition.
+    Returns finish times (n_plans, n_samples) and, per plan and segment, the number of samples
+    whose energy use broke the rider's own CP/W' boundary (same model as check_energy_constraint).
+    """
+    slopes = track.arrays['slope']
+    segment_lengths = track.arrays['segment_length']
+    headings = segment_headings(track)
+
+    col = lambda name: conditions[name][:, None]
+    headwind = col('wind_speed') * np.cos(col('wind_direction') - headings[None, :])
+    w_prime_j = col('w_prime') * 1000
+
+    finish_times = np.empty((len(plans), len(conditions['cp'])))
+    depletion_counts = np.zeros((len(plans), len(slopes)), dtype=np.int64)
+    for k, powers in enumerate(plans):
+        v = solve_velocity_wind(powers[None, :], slopes[None, :], headwind, col('rho'), col('cda'))
+        dts = segment_lengths[None, :] / v
+        times = np.cumsum(dts, axis=1)
+        prev_powers = np.concatenate(([0.0], powers[:-1]))
+        energy = np.cumsum(0.5 * (prev_powers + powers)[None, :] * dts, axis=1)
+        depleted = energy > col('cp') * times + w_prime_j
+        finish_times[k] = times[:, -1]
+        depletion_counts[k] = depleted.sum(axis=0)
+    return finish_times, depletion_counts
+
+def _run_chunk(args):
+    track, plans, n_samples, seed, rider = args
+    rng = np.random.default_rng(seed)
+    conditions = sample_conditions(n_samples, rng, **rider)
+    return evaluate_plans(track, plans, conditions)
+
+def run_pacing_ensemble(track, cp_mean, cp_sd, w_prime_mean, pan, n_samples=2000, plans=None,
+                        seed=None, processes=None, chunk_size=500, **condition_kwargs):
+    """
+    Monte Carlo over rider (CP, W') and weather (air density, CdA, wind) uncertainty.
+    plans defaults to the deterministic plan from calculate_next_optimal_power_value; pass an
+    (n_plans x n_segments) array to compare candidate plans under common random conditions.
+    """
+    if plans is None:
+        plans = pc.calculate_next_optimal_power_value(cp_mean, cp_sd, w_prime_mean, pan, track)['powers']
+    plans = np.atleast_2d(np.asarray(plans, dtype=float))
+
+    rider = dict(cp_mean=cp_mean, cp_sd=cp_sd, w_prime_mean=w_prime_mean, **condition_kwargs)
+    sizes = [min(chunk_size, n_samples - start) for start in range(0, n_samples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(track, plans, size, s, rider) for size, s in zip(sizes, seeds)]
+
+    if len(jobs) > 1 and processes != 1:
+        with Pool(processes) as pool:
+            results = pool.map(_run_chunk, jobs)
+    else:
+        results = [_run_chunk(job) for job in jobs]
+
+    finish_times = np.concatenate([r[0] for r in results], axis=1)
+    depletion_probability = sum(r[1] for r in results) / n_samples
+
+    return {
+        'finish_times': finish_times,
+        'finish_time_quantiles': {q: np.quantile(finish_times, q, axis=1) for q in (0.05, 0.5, 0.95)},
+        'depletion_probability': depletion_probability,
+        'plans': plans,
+    }
+
+def plot_finish_time_distribution(ensemble, bins=50):
+    import matplotlib.pyplot as plt
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
+    ax1.hist(ensemble['finish_times'][0], bins=bins, color='firebrick', alpha=0.7)
+    ax1.set_xlabel('Finishing Time (s)')
+    ax1.set_ylabel('Count')
+    ax1.set_title('Finishing Time Distribution')
+    ax1.grid(True, alpha=0.3)
+
+    ax2.plot(ensemble['depletion_probability'][0], color='black')
+    ax2.set_xlabel('Segment')
+    ax2.set_ylabel("P(W' depleted)")
+    ax2.set_title("Probability of W' Depletion per Segment")
+    ax2.grid(True, alpha=0.3)
+    plt.show()
+
+if __name__ == "__main__":
+    import track as track_module
+
+    course = track_module.generate_track(n_points=1000, total_length=5000.0)
+    ensemble = run_pacing_ensemble(course, 395.3, 31.8, 22.0, 600, n_samples=4000, seed=0)
+    q = ensemble['finish_time_quantiles']
+    print(f"Finishing time: median {q[0.5][0]:.1f} s, 90% interval [{q[0.05][0]:.1f}, {q[0.95][0]:.1f}] s")
+    print(f"Max per-segment W' depletion probability: {ensemble['depletion_probability'][0].max():.1%}")
+    plot_finish_time_distribution(ensemble)
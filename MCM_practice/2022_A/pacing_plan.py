@@ -0,0 +1,78 @@
+import numpy as np
+
+class PacingPlan:
+    """
+    Precomputed pacing plan over a track. Segment i covers (distances[i], distances[i+1]] and is
+    ridden at constant power and speed, so power/speed are piecewise constant in distance while
+    time and W' balance are piecewise linear. All queries accept scalars or arrays and raise
+    ValueError for distances/times outside the plan instead of extrapolating.
+    """
+    def __init__(self, segment_lengths, powers, times, w_prime_balance=None, w_prime_start=None):
+        segment_lengths = np.asarray(segment_lengths, dtype=float)
+        self.distances = np.concatenate(([0.0], np.cumsum(segment_lengths)))
+        self.times = np.concatenate(([0.0], np.asarray(times, dtype=float)))
+        self.powers = np.asarray(powers, dtype=float)
+        self.speeds = segment_lengths / np.diff(self.times)
+        if w_prime_balance is None:
+            self.w_prime_balance = None
+        else:
+            start = w_prime_balance[0] if w_prime_start is None else w_prime_start
+            self.w_prime_balance = np.concatenate(([start], np.asarray(w_prime_balance, dtype=float)))
+
+    @classmethod
+    def from_results(cls, results, track):
+        """Build from the dict returned by power_calculator.calculate_next_optimal_power_value."""
+        return cls(track.arrays['segment_length'], results['powers'], results['times'],
+                   results.get('w_prime_balance'), results.get('w_prime_start'))
+
+    @property
+    def total_length(self) -> float:
+        return self.distances[-1]
+
+    @property
+    def total_time(self) -> float:
+        return self.times[-1]
+
+    def _segment_index(self, distance):
+        distance = np.asarray(distance, dtype=float)
+        # Allow for rounding differences between summation orders of the segment lengths
+        tolerance = 1e-9 * self.total_length
+        if np.any(distance < -tolerance) or np.any(distance > self.total_length + tolerance):
+            raise ValueError(f"Distance outside plan range [0, {self.total_length:.1f}] m")
+        distance = np.clip(distance, 0.0, self.total_length)
+        idx = np.searchsorted(self.distances, distance, side='left') - 1
+        return distance, np.clip(idx, 0, len(self.powers) - 1)
+
+    def power_at(self, distance):
+        _, idx = self._segment_index(distance)
+        return self.powers[idx]
+
+    def speed_at(self, distance):
+        _, idx = self._segment_index(distance)
+        return self.speeds[idx]
+
+    def time_at(self, distance):
+        distance, idx = self._segment_index(distance)
+        return self.times[idx] + (distance - self.distances[idx]) / self.speeds[idx]
+
+    def distance_at(self, time):
+        time = np.asarray(time, dtype=float)
+        if np.any(time < 0) or np.any(time > self.total_time):
+            raise ValueError(f"Time outside plan range [0, {self.total_time:.1f}] s")
+        idx = np.clip(np.searchsorted(self.times, time, side='left') - 1, 0, len(self.powers) - 1)
+        return self.distances[idx] + (time - self.times[idx]) * self.speeds[idx]
+
+    def w_prime_at(self, distance):
+        if self.w_prime_balance is None:
+            raise ValueError("Plan was built without W' balance")
+        distance, idx = self._segment_index(distance)
+        frac = (distance - self.distances[idx]) / (self.distances[idx + 1] - self.distances[idx])
+        return self.w_prime_balance[idx] + frac * (self.w_prime_balance[idx + 1] - self.w_prime_balance[idx])
+
+    def time_gap(self, distance, elapsed_time):
+        """Seconds behind (+) or ahead (-) of plan for telemetry samples."""
+        return np.asarray(elapsed_time, dtype=float) - self.time_at(distance)
+
+    def power_gap(self, distance, power):
+        """Measured power minus planned power for telemetry samples."""
+        return np.asarray(power, dtype=float) - self.power_at(distance)
@@ -1,8 +1,13 @@
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
-import scipy.interpolate
 from scipy.optimize import minimize
 from scipy.integrate import cumulative_trapezoid
+from pacing_plan import PacingPlan
+
+import repo_root  # puts the repo root on sys.path for the shared modules
+import instrument
+import kernel_backend
 
 MASS_SYS = 72.6 + 8.0
 G = 9.81
@@ -10,6 +15,14 @@ RHO = 1.225
 CDA = 0.276
 CRR = 0.004
 
+# Cornering and surface model (pacing_inputs(..., cornering=True))
+MU_TIRE = 0.8         # tyre-road friction coefficient: cornering speed sqrt(MU_TIRE * G * R)
+ROUGHNESS_REF = 0.5   # roughness at which rolling resistance equals CRR
+CRR_ROUGHNESS = 0.006 # change in Crr per unit roughness
+CRR_MIN = 0.002
+MAX_ACCEL = 1.0       # m/s^2 when speeding up out of a corner
+MAX_BRAKE = 3.0       # m/s^2 when braking into a corner
+
 def solve_velocity(power, slope):
     alpha = np.arctan(slope)
     a_coeff = 0.5 * CDA * RHO
@@ -21,6 +34,55 @@ def solve_velocity(power, slope):
     real_roots = roots[np.isreal(roots)].real
     return real_roots[real_roots > 0][0]
 
+def solve_velocity_array(power, slope, rho=RHO, cda=CDA, crr=CRR, mass=MASS_SYS):
+    """
+    Vectorized solve_velocity: closed-form positive root of 0.5*CdA*rho*v^3 + c*v - P = 0
+    for arrays of powers/slopes (and optionally per-element rho, CdA, Crr).
+    """
+    alpha = np.arctan(slope)
+    a_coeff = 0.5 * cda * rho
+    c_coeff = mass * G * (np.sin(alpha) + crr * np.cos(alpha))
+    # Depressed cubic v^3 + p*v + q = 0
+    p = c_coeff / a_coeff
+    q = -np.asarray(power, dtype=float) / a_coeff
+    disc = (q / 2)**2 + (p / 3)**3
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # One real root (Cardano)
+        sqrt_disc = np.sqrt(np.maximum(disc, 0.0))
+        v_single = np.cbrt(-q / 2 + sqrt_disc) + np.cbrt(-q / 2 - sqrt_disc)
+        # Three real roots (steep descents): take the largest
+        r = np.sqrt(np.maximum(-p / 3, 0.0))
+        cos_arg = np.clip((3 * q) / (2 * p) * np.sqrt(np.maximum(-3 / p, 0.0)), -1.0, 1.0)
+        v_triple = 2 * r * np.cos(np.arccos(cos_arg) / 3)
+    return np.where(disc >= 0, v_single, v_triple)
+
+def rolling_resistance(roughness):
+    """Per-segment Crr: CRR at ROUGHNESS_REF, rising linearly with surface roughness (0-1)."""
+    return np.maximum(CRR + CRR_ROUGHNESS * (np.asarray(roughness, dtype=float) - ROUGHNESS_REF), CRR_MIN)
+
+def cornering_speed(turning_angle, segment_length, mu=MU_TIRE):
+    """Grip-limited speed sqrt(mu*g*R) with turn radius R = segment_length / |turning_angle| (inf when straight)."""
+    turning_angle = np.abs(np.asarray(turning_angle, dtype=float))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        radius = np.where(turning_angle > 0, np.asarray(segment_length, dtype=float) / turning_angle, np.inf)
+    return np.sqrt(mu * G * radius)
+
+def speed_envelope(v_max, segment_length, accel=MAX_ACCEL, brake=MAX_BRAKE):
+    """
+    Fastest speed profile under the per-segment caps v_max with speed changes limited to accel
+    (speeding up) and brake (slowing down) over each segment length:
+        v[i]^2 <= v[i-1]^2 + 2*accel*ds,  v[i]^2 <= v[i+1]^2 + 2*brake*ds.
+    In the shifted variables v^2 - 2*accel*s and v^2 + 2*brake*s (s: distance at segment start)
+    both recursions are running minima, so the forward and backward passes are one
+    np.minimum.accumulate each. The backward pass runs on the forward profile.
+    """
+    s = np.concatenate([[0.0], np.cumsum(segment_length)[:-1]])
+    v2 = np.asarray(v_max, dtype=float)**2
+    forward = np.minimum.accumulate(v2 - 2 * accel * s) + 2 * accel * s
+    backward = np.minimum.accumulate((forward + 2 * brake * s)[::-1])[::-1] - 2 * brake * s
+    return np.sqrt(np.maximum(backward, 0.0))
+
 def check_energy_constraint(power_history, time_history, cp_mean, cp_sd, w_prime_mean):
     if len(power_history) < 2:
         return True
@@ -29,52 +91,110 @@ def check_energy_constraint(power_history, time_history, cp_mean, cp_sd, w_prime
     max_allowable_energy = (cp_mean + cp_sd) * t_star + (w_prime_mean * 1000)
     return total_energy_used <= max_allowable_energy
 
-def calculate_next_optimal_power_value(cp_mean, cp_sd, w_prime_mean, pan, track):
-    # Initialize with 0 to keep lengths aligned for integration
-    powers = [0.0] 
-    times = [0.0]
+def pacing_inputs(cp_mean, pan, track, cornering=False):
+    """
+    Per-segment greedy target power and segment times at the target and at CP (independent of W').
+    With cornering=True, rolling resistance follows the segment roughness and both speed profiles
+    are capped by cornering grip and the braking/acceleration envelope (speed_envelope). Powers
+    stay at their targets, so effort lost to braking still counts against W'.
+    """
+    slopes = track.arrays['slope']
+    segment_lengths = track.arrays['segment_length']
+
+    # 1. Local greedy choice and 2. physics, solved for every segment at once
+    target_powers = cp_mean + np.where(slopes > 0, pan, 0.0)
+    if not cornering:
+        target_dts = segment_lengths / solve_velocity_array(target_powers, slopes)
+        fallback_dts = segment_lengths / solve_velocity_array(np.full_like(slopes, cp_mean), slopes)
+        return target_powers, target_dts, fallback_dts
+
+    crr = rolling_resistance(track.arrays['roughness'])
+    v_corner = cornering_speed(track.arrays['turning_angle'], segment_lengths)
+    target_v = np.minimum(solve_velocity_array(target_powers, slopes, crr=crr), v_corner)
+    fallback_v = np.minimum(solve_velocity_array(np.full_like(slopes, cp_mean), slopes, crr=crr), v_corner)
+    target_dts = segment_lengths / speed_envelope(target_v, segment_lengths)
+    fallback_dts = segment_lengths / speed_envelope(fallback_v, segment_lengths)
+    return target_powers, target_dts, fallback_dts
+
+def pace_segments(target_powers, target_dts, fallback_dts, cp_mean, cp_sd, w_prime_mean):
+    """Sequential W' feasibility pass over precomputed pacing_inputs."""
+    sustainable_power = cp_mean + cp_sd
+    w_prime_j = w_prime_mean * 1000
+    if kernel_backend.active():
+        powers, times, w_prime_balance = _pace_segments_kernel(
+            np.asarray(target_powers, dtype=float), np.asarray(target_dts, dtype=float),
+            np.asarray(fallback_dts, dtype=float), float(cp_mean), float(sustainable_power), float(w_prime_j))
+        return {
+            "powers": powers,
+            "times": times,
+            "w_prime_balance": w_prime_balance,
+            "w_prime_start": w_prime_j
+        }
+
+    n = len(target_powers)
+    powers = np.empty(n)
+    times = np.empty(n)
+    w_prime_balance = np.empty(n)
+
+    # The power history starts from 0 W at t = 0 (same padding as check_energy_constraint);
+    # its trapezoid integral is accumulated one segment at a time instead of recomputed
+    energy = 0.0
     total_time = 0.0
-    
-    for point in track.points:
-        # 1. Local Greedy Choice
-        target_p = cp_mean + (pan if point.slope > 0 else 0)
-        
-        # 2. Physics: Solve for velocity
-        v = solve_velocity(target_p, point.slope)
-        dt = point.segment_length / v
-        
-        # 3. Build temporary lists for the constraint check
-        temp_p = powers + [target_p]
-        temp_t = times + [total_time + dt]
-        
+    prev_p = 0.0
+    for i, (target_p, dt, fallback_dt) in enumerate(zip(target_powers.tolist(), target_dts.tolist(),
+                                                        fallback_dts.tolist())):
         # 4. Check Energy Boundary
-        if not check_energy_constraint(temp_p, temp_t, cp_mean, cp_sd, w_prime_mean):
+        if energy + 0.5 * (prev_p + target_p) * dt > sustainable_power * (total_time + dt) + w_prime_j:
             target_p = cp_mean
-            v = solve_velocity(target_p, point.slope)
-            dt = point.segment_length / v
-        
-        # Update actual histories
-        powers.append(target_p)
+            dt = fallback_dt
+
+        energy += 0.5 * (prev_p + target_p) * dt
         total_time += dt
-        times.append(total_time)
-        
-    # Return slices that ignore the initial [0.0] padding to match track points
+        prev_p = target_p
+        powers[i] = target_p
+        times[i] = total_time
+        w_prime_balance[i] = sustainable_power * total_time + w_prime_j - energy
+
     return {
-        "powers": np.array(powers[1:]), 
-        "times": np.array(times[1:])
+        "powers": powers,
+        "times": times,
+        "w_prime_balance": w_prime_balance,
+        "w_prime_start": w_prime_j
     }
 
+@kernel_backend.jit
+def _pace_segments_kernel(target_powers, target_dts, fallback_dts, cp_mean, sustainable_power, w_prime_j):
+    """Compiled W' feasibility pass of pace_segments (same operations in the same order)."""
+    n = len(target_powers)
+    powers = np.empty(n)
+    times = np.empty(n)
+    w_prime_balance = np.empty(n)
+    energy = 0.0
+    total_time = 0.0
+    prev_p = 0.0
+    for i in range(n):
+        target_p = target_powers[i]
+        dt = target_dts[i]
+        if energy + 0.5 * (prev_p + target_p) * dt > sustainable_power * (total_time + dt) + w_prime_j:
+            target_p = cp_mean
+            dt = fallback_dts[i]
+
+        energy += 0.5 * (prev_p + target_p) * dt
+        total_time += dt
+        prev_p = target_p
+        powers[i] = target_p
+        times[i] = total_time
+        w_prime_balance[i] = sustainable_power * total_time + w_prime_j - energy
+    return powers, times, w_prime_balance
+
+def calculate_next_optimal_power_value(cp_mean, cp_sd, w_prime_mean, pan, track, cornering=False):
+    with instrument.stage("pacing.plan", work=len(track)):
+        target_powers, target_dts, fallback_dts = pacing_inputs(cp_mean, pan, track, cornering)
+        return pace_segments(target_powers, target_dts, fallback_dts, cp_mean, cp_sd, w_prime_mean)
+
 def get_optimal_power_function(results, track):
-    distances = np.cumsum([p.segment_length for p in track.points])
-    powers = results['powers']
-    
-    power_function = scipy.interpolate.interp1d(
-        distances, 
-        powers, 
-        kind='linear', 
-        fill_value="extrapolate"
-    )
-    return power_function
+    """Power-at-distance lookup backed by a PacingPlan (raises outside the track instead of extrapolating)."""
+    return PacingPlan.from_results(results, track).power_at
 
 def plot_optimal_power_function(power_function, total_length):
     distances = np.linspace(0, total_length, 1000)
@@ -89,3 +209,8 @@ def plot_optimal_power_function(power_function, total_length):
     plt.legend()
     plt.grid(True, alpha=0.3)
     plt.show()
+
+# Probes for instrument.enable(["pacing"]) (np.roots shows up under solve_velocity)
+instrument.register("pacing", sys.modules[__name__], "solve_velocity", "solve_velocity_array", "check_energy_constraint",
+                    "speed_envelope", "pacing_inputs", "pace_segments")
+instrument.register("plot", sys.modules[__name__], "plot_optimal_power_function")
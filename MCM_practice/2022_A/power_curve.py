@@ -1,3 +1,4 @@
+import math
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -9,4 +10,19 @@ def find_tt_power_curve(cp_mean, w_prime_mean, pan):
     p = cp_mean + pan / (1 + (t / tau))
     power_curve_data = {'time_seconds': t, 'power_watts': p}
     return power_curve_data
-    
\ No newline at end of file
+
+def w_prime_balance_step(w_bal, power, dt, cp, w_prime_j):
+    """
+    Advance the Skiba differential W' balance by dt seconds at constant power.
+    Above CP W' is spent linearly; below CP it recovers with dW'/dt = (W'0 - W')(CP - P)/W'0,
+    integrated exactly over the step so the update is stable for any sample interval.
+    """
+    if power > cp:
+        return w_bal - (power - cp) * dt
+    return w_prime_j - (w_prime_j - w_bal) * math.exp(-(cp - power) * dt / w_prime_j)
+
+def time_to_exhaustion(power, cp, w_bal):
+    """Seconds until W' balance hits zero at constant power (inf at or below CP)."""
+    if power <= cp:
+        return np.inf
+    return max(w_bal, 0.0) / (power - cp)
@@ -1,3 +1,33 @@
+import numpy as np
+
 def add_to_race_data(power, new_p):
     power.append(new_p)
     return power
+
+class PowerRingBuffer:
+    """Fixed-capacity buffer of (timestamp, power) samples with O(1) append and rolling sum."""
+    def __init__(self, capacity=3600):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity)
+        self.powers = np.zeros(capacity)
+        self.count = 0
+        self.head = 0  # index of the next write
+        self.power_sum = 0.0
+
+    def append(self, timestamp, power):
+        if self.count == self.capacity:
+            self.power_sum -= self.powers[self.head]
+        else:
+            self.count += 1
+        self.timestamps[self.head] = timestamp
+        self.powers[self.head] = power
+        self.power_sum += power
+        self.head = (self.head + 1) % self.capacity
+
+    def mean_power(self):
+        return self.power_sum / self.count if self.count else 0.0
+
+    def ordered(self):
+        """Samples oldest to newest as (timestamps, powers) copies."""
+        idx = (np.arange(self.count) + self.head - self.count) % self.capacity
+        return self.timestamps[idx], self.powers[idx]
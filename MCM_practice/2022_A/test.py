@@ -1,10 +1,27 @@
+import random
+
+import repo_root  # puts the repo root on sys.path for the shared modules
+from sim_cache import SimCache, code_version
+
 import power_calculator
 import track
 
-track=track.generate_track(n_points=1000, total_length=5000.0)
-results = power_calculator.calculate_next_optimal_power_value(395.3, 31.8, 22.0, 600, track)
+SEED = 2022
+
+def compute():
+    random.seed(SEED)
+    course = track.generate_track(n_points=1000, total_length=5000.0)
+    results = power_calculator.calculate_next_optimal_power_value(395.3, 31.8, 22.0, 600, course)
+    return {**{f"track_{name}": values for name, values in course.arrays.items()}, **results}
+
+# Reuses the track and plan of an identical earlier run
+cached = SimCache().cached("pacing_test", compute, {"n_points": 1000, "total_length": 5000.0, "cp_mean": 395.3,
+                                                    "cp_sd": 31.8, "w_prime_mean": 22.0, "pan": 600}, seed=SEED,
+                           version=code_version(track.__file__, power_calculator.__file__))
+track = track.Track.from_arrays({name[6:]: values for name, values in cached.items() if name.startswith("track_")})
+results = {name: values for name, values in cached.items() if not name.startswith("track_")}
 p_func = power_calculator.get_optimal_power_function(results, track)
-power_calculator.plot_optimal_power_function(p_func, 10000.0)
+power_calculator.plot_optimal_power_function(p_func, track.total_length)
 
 #total velocity=768.5 seconds
 
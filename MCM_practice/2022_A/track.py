@@ -1,8 +1,13 @@
 import math
 import random
+import sys
+import numpy as np
 from dataclasses import dataclass
 from typing import List
 
+import repo_root  # puts the repo root on sys.path for the shared modules
+import instrument
+
 @dataclass
 class TrackPoint:
     x: float
@@ -13,32 +18,61 @@ class TrackPoint:
     turning_angle: float # radians
     roughness: float # 0 to 1
 
+TRACK_FIELDS = ('x', 'y', 'z', 'segment_length', 'slope', 'turning_angle', 'roughness')
+
 class Track:
+    """
+    A course stored either as TrackPoint objects or as one numpy column per TrackPoint field.
+    Whichever form is missing is built lazily, so array-backed courses never create per-point objects
+    unless .points is accessed.
+    """
     def __init__(self, points: List[TrackPoint]):
-        self.points = points
+        self._points = points
+        self._arrays = None
+
+    @classmethod
+    def from_arrays(cls, arrays) -> 'Track':
+        track = cls.__new__(cls)
+        track._points = None
+        track._arrays = {name: np.asarray(arrays[name], dtype=float) for name in TRACK_FIELDS}
+        return track
+
+    @property
+    def points(self) -> List[TrackPoint]:
+        if self._points is None:
+            columns = [self._arrays[name].tolist() for name in TRACK_FIELDS]
+            self._points = [TrackPoint(*row) for row in zip(*columns)]
+        return self._points
+
+    @property
+    def arrays(self):
+        if self._arrays is None:
+            self._arrays = {name: np.fromiter((getattr(p, name) for p in self._points), dtype=float,
+                                              count=len(self._points))
+                            for name in TRACK_FIELDS}
+        return self._arrays
+
+    def __len__(self) -> int:
+        return len(self.arrays['segment_length'])
 
     @property
     def total_length(self) -> float:
-        return sum(p.segment_length for p in self.points)
+        return float(np.sum(self.arrays['segment_length']))
 
     @property
     def total_slope(self) -> float:
-        return sum(p.slope for p in self.points)
+        return float(np.sum(self.arrays['slope']))
 
     @property
     def total_turning_angle(self) -> float:
-        return sum(p.turning_angle for p in self.points)
+        return float(np.sum(self.arrays['turning_angle']))
 
     def is_closed(self, tolerance=1.0) -> bool:
-        if not self.points: return False
-        start = self.points[0]
-        end = self.points[-1] # Actually, the track generated ends at 0,0, but usually points layout is 0..N-1
-        # The generator returns points relative to the start/end being closed.
-        # Let's check the last point coordinates vs 0 (start).
-        # Actually our generator logic forces end to 0,0.
-        dist = math.sqrt(end.x**2 + end.y**2 + end.z**2) 
-        # But wait, end.z might not be 0 if slope noise didn't perfectly cancel?
-        # We enforced slope mean 0, so sum(slope)*len should be 0.
+        if len(self) == 0: return False
+        # The generator forces the end point back to the start at (0, 0).
+        # z should also return to 0 since the slopes are enforced to have mean 0.
+        arrays = self.arrays
+        dist = math.sqrt(arrays['x'][-1]**2 + arrays['y'][-1]**2 + arrays['z'][-1]**2)
         return dist < tolerance
 
 def _convolve_smooth(data: List[float], window_size: int) -> List[float]:
@@ -151,3 +185,59 @@ def generate_track(n_points: int = 1000, total_length: float = 10000.0) -> Track
             
     print("Warning: Could not satisfy all constraints perfectly.")
     return Track(final_points) # Return whatever we got
+
+def _smooth_array(data: np.ndarray, window_size: int) -> np.ndarray:
+    """Vectorized equivalent of _convolve_smooth (truncated window at the edges)."""
+    n = len(data)
+    csum = np.concatenate(([0.0], np.cumsum(data)))
+    idx = np.arange(n)
+    start = np.maximum(0, idx - window_size // 2)
+    end = np.minimum(n, idx + window_size // 2 + 1)
+    return (csum[end] - csum[start]) / (end - start)
+
+def sample_track_arrays(rng: np.random.Generator, n_points: int = 1000, total_length: float = 10000.0,
+                        min_sharp_turns: int = 4, sharp_angle: float = 0.08,
+                        max_net_angle: float = 1.0, max_attempts: int = 50):
+    """
+    Rejection-sample a closed course with the same recipe as generate_track,
+    drawing from a seeded numpy Generator.
+    Returns (arrays, attempts); arrays is None if no attempt satisfied the constraints.
+    """
+    segment_len = total_length / n_points
+
+    slopes = _smooth_array(rng.normal(0, 0.05, n_points), 50)
+    slopes -= slopes.mean()
+
+    for attempt in range(1, max_attempts + 1):
+        angles = _smooth_array(rng.normal(0, 0.1, n_points), 50)
+        angles -= angles.mean()
+
+        headings = np.cumsum(angles)
+        xs = np.concatenate(([0.0], np.cumsum(segment_len * np.cos(headings))))
+        ys = np.concatenate(([0.0], np.cumsum(segment_len * np.sin(headings))))
+
+        # Linear closure correction
+        factor = np.arange(n_points + 1) / n_points
+        xs -= (xs[-1] - xs[0]) * factor
+        ys -= (ys[-1] - ys[0]) * factor
+
+        new_headings = np.arctan2(np.diff(ys), np.diff(xs))
+        turning = np.zeros(n_points)
+        turning[1:] = (np.diff(new_headings) + np.pi) % (2 * np.pi) - np.pi
+
+        sharp_count = np.count_nonzero(np.abs(turning) > sharp_angle)
+        if sharp_count >= min_sharp_turns and abs(turning.sum()) < max_net_angle:
+            arrays = {
+                'x': xs[1:],
+                'y': ys[1:],
+                'z': np.cumsum(slopes * segment_len),
+                'segment_length': np.full(n_points, segment_len),
+                'slope': slopes,
+                'turning_angle': turning,
+                'roughness': np.clip(rng.normal(0.5, 0.1, n_points), 0.0, 1.0),
+            }
+            return arrays, attempt
+
+    return None, max_attempts
+
+instrument.register("pacing", sys.modules[__name__], "generate_track", "sample_track_arrays")
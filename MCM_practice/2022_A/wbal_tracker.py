@@ -0,0 +1,83 @@
+import numpy as np
+import power_calculator
+import power_curve
+from pacing_plan import PacingPlan
+from race_data import PowerRingBuffer
+
+class WPrimeBalanceTracker:
+    """
+    Streaming W' balance for live power samples.
+    Each sample updates the Skiba differential balance in O(1); when a track is attached, re-pacing
+    advice for the rest of the course is recomputed with the pacing engine at most every
+    advice_interval seconds, starting from the rider's current W' balance (cornering=True uses the
+    cornering/roughness speed limits of power_calculator.pacing_inputs). Timestamps are elapsed
+    ride time in seconds, 0 at the start line, the same clock as the plan's times.
+    """
+    def __init__(self, cp_mean, w_prime_mean, cp_sd=0.0, pan=0.0, track=None, plan=None,
+                 capacity=3600, advice_interval=10.0, cornering=False):
+        self.cp_mean = cp_mean
+        self.cp_sd = cp_sd
+        self.pan = pan
+        self.w_prime_j = w_prime_mean * 1000
+        self.w_bal = self.w_prime_j
+        self.buffer = PowerRingBuffer(capacity)
+        self.track = track
+        self.plan = plan
+        if track is not None and plan is None:
+            results = power_calculator.calculate_next_optimal_power_value(cp_mean, cp_sd, w_prime_mean, pan, track,
+                                                                          cornering)
+            self.plan = PacingPlan.from_results(results, track)
+        if track is not None:
+            # Segment physics does not depend on W', so re-planning only reruns the feasibility pass
+            self.pacing_inputs = power_calculator.pacing_inputs(cp_mean, pan, track, cornering)
+        self.advice_interval = advice_interval
+        self.last_time = None
+        self.last_advice_time = -np.inf
+        self.advice = None
+
+    def add_sample(self, timestamp, power, distance=None):
+        """Ingest one sample. Returns new advice when it was refreshed, otherwise None."""
+        if self.last_time is not None:
+            self.w_bal = power_curve.w_prime_balance_step(
+                self.w_bal, power, timestamp - self.last_time, self.cp_mean, self.w_prime_j)
+        self.last_time = timestamp
+        self.buffer.append(timestamp, power)
+
+        if (self.track is not None and distance is not None
+                and timestamp - self.last_advice_time >= self.advice_interval):
+            self.last_advice_time = timestamp
+            self.advice = self.advise(distance, timestamp)
+            return self.advice
+        return None
+
+    def time_to_exhaustion(self, power=None):
+        """Seconds to empty W' at the given power (default: rolling mean power of the buffer)."""
+        if power is None:
+            power = self.buffer.mean_power()
+        return power_curve.time_to_exhaustion(power, self.cp_mean, self.w_bal)
+
+    def advise(self, distance, timestamp):
+        """
+        Re-plan the rest of the course from the current W' balance. GPS distances a little past the
+        finish are clipped to the end of the plan. timestamp is elapsed ride time (s); the projected
+        finish time is on the same clock, counting only the part of the current segment still ahead.
+        """
+        distance = min(max(distance, 0.0), self.plan.total_length)
+        segment = int(np.searchsorted(self.plan.distances, distance, side='right')) - 1
+        segment = min(max(segment, 0), len(self.plan.powers) - 1)
+        results = power_calculator.pace_segments(
+            *(values[segment:] for values in self.pacing_inputs),
+            self.cp_mean, self.cp_sd, max(self.w_bal, 0.0) / 1000)
+        # The replanned first segment starts at its beginning; the rider is already part-way along it
+        ridden = (distance - self.plan.distances[segment]) / (self.plan.distances[segment + 1]
+                                                              - self.plan.distances[segment])
+        remaining_time = results['times'][-1] - ridden * results['times'][0]
+        return {
+            'time': timestamp,
+            'distance': distance,
+            'w_prime_balance': self.w_bal,
+            'target_power': results['powers'][0],
+            'planned_power': self.plan.power_at(distance),
+            'time_gap': self.plan.time_gap(distance, timestamp),
+            'projected_finish_time': timestamp + remaining_time,
+        }
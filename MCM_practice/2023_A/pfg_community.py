@@ -0,0 +1,210 @@
+import numpy as np
+
+import repo_root  # puts the repo root on sys.path for the shared modules
+import instrument
+import kernel_backend
+
+# Weather patterns as integer codes (index into the per-weather tables below)
+WEATHER_TYPES = ('normal', 'drought', 'severe_drought', 'flood')
+WEATHER_CODES = {weather: code for code, weather in enumerate(WEATHER_TYPES)}
+IRREGULAR_WEATHER = np.array([WEATHER_CODES['flood'], WEATHER_CODES['drought'], WEATHER_CODES['severe_drought']])
+
+# Fraction of the water / space available under each weather pattern
+WATER_FACTOR = np.array([1.0, 0.4, 0.2, 1.0])
+SPACE_FACTOR = np.array([1.0, 1.0, 1.0, 0.6])
+
+MAX_WATER = 10000  # Total water available
+MAX_SPACE = 5000   # Total space available
+KERNEL_CYCLES = 256  # cycles per compiled-kernel call (uniforms are drawn for a block at a time)
+
+class PFGCommunity:
+    """
+    Array-backed community of plant functional groups.
+    Traits and populations are stored as vectors and all groups advance together each cycle,
+    with the same stress, birth and survival rules as PlantFunctionalGroup.update_population.
+    """
+    def __init__(self, drought_resistance, water_requirement, lifespan, space_requirement, population, names=None):
+        self.drought_resistance = np.asarray(drought_resistance, dtype=np.int64)
+        self.water_requirement = np.asarray(water_requirement, dtype=np.int64)
+        self.lifespan = np.asarray(lifespan, dtype=np.int64)
+        self.space_requirement = np.asarray(space_requirement, dtype=np.int64)
+        self.population = np.array(population, dtype=np.int64)
+        self.names = names if names is not None else [f"PFG_{i+1}" for i in range(len(self.population))]
+
+        # Per-individual water use and trait-only parts of the update rule
+        efficiency_factor = self.drought_resistance / 10.0
+        self.water_per_individual = self.water_requirement * (1.0 - (efficiency_factor * 0.5))
+        annual = self.lifespan <= 2
+        self.reproduction_gain = np.where(annual, 2.5, 1.3) - 1.0
+        self.base_survival = np.where(annual, 0.05, 0.75)
+        # weather_stress[code] is the weather stress of every group under that weather pattern
+        self.weather_stress = np.stack([
+            np.ones(len(self.population)),
+            0.5 + (self.drought_resistance / 20.0),
+            0.3 + (self.drought_resistance / 33.0),
+            0.6 + (1.0 - self.space_requirement / 10.0) * 0.3,
+        ])
+
+    @classmethod
+    def from_pfgs(cls, pfgs):
+        """Build from a list of PlantFunctionalGroup objects (current populations)."""
+        return cls([p.drought_resistance for p in pfgs], [p.water_requirement for p in pfgs],
+                   [p.lifespan for p in pfgs], [p.space_requirement for p in pfgs],
+                   [p.population for p in pfgs], [p.name for p in pfgs])
+
+    @classmethod
+    def random(cls, num_pfgs, rng, variable_initial=True):
+        """Random traits (1-10) and initial populations, like generate_random_pfgs."""
+        water_requirement = rng.integers(1, 11, num_pfgs)
+        drought_resistance = rng.integers(1, 11, num_pfgs)
+        lifespan = rng.integers(1, 11, num_pfgs)
+        space_requirement = rng.integers(1, 11, num_pfgs)
+        population = rng.integers(20, 151, num_pfgs) if variable_initial else np.full(num_pfgs, 100)
+        return cls(drought_resistance, water_requirement, lifespan, space_requirement, population)
+
+    def __len__(self):
+        return len(self.population)
+
+    def water_demand(self):
+        return self.population * self.water_per_individual
+
+    def space_demand(self):
+        return self.population * self.space_requirement
+
+    def resource_stress(self, total_water_demand, total_space_demand, available_water, available_space):
+        """Shared resource stress of the community (see PlantFunctionalGroup.calculate_resource_stress)."""
+        water_availability = max(0.1, available_water / max(1, total_water_demand))
+        space_availability = max(0.1, available_space / max(1, total_space_demand))
+        return min(2.0, max(0.2, (water_availability * space_availability) ** 0.5))
+
+    def step(self, weather_code, uniforms, max_water=MAX_WATER, max_space=MAX_SPACE):
+        """
+        Advance all groups by one weather cycle.
+        uniforms holds one U(0, 1) draw per group for the near-extinction recovery rule.
+        """
+        if kernel_backend.active():
+            return self.step_cycles(np.array([weather_code]), np.asarray(uniforms)[None, :], max_water, max_space)[0]
+        total_water_demand = float(np.sum(self.water_demand()))
+        total_space_demand = float(np.sum(self.space_demand()))
+        resource_stress = self.resource_stress(total_water_demand, total_space_demand,
+                                               max_water * WATER_FACTOR[weather_code],
+                                               max_space * SPACE_FACTOR[weather_code])
+        combined_stress = resource_stress * self.weather_stress[weather_code]
+
+        population = self.population
+        density_factor = np.maximum(0.1, 1.0 - (population / 1000.0))
+        births = population * self.reproduction_gain * combined_stress * density_factor
+        survivors = population * (self.base_survival * combined_stress)
+        population = (survivors + births).astype(np.int64)
+
+        # Extinction threshold: 30% chance to recover if nearly extinct
+        recover = (population > 0) & (population < 5) & (uniforms > 0.7)
+        population = np.where(recover, np.maximum(1, (population * 0.5).astype(np.int64)), population)
+        self.population = np.maximum(0, population)
+        return self.population
+
+    def step_cycles(self, weather_codes, uniforms, max_water=MAX_WATER, max_space=MAX_SPACE, out=None):
+        """
+        Advance through several cycles in the compiled kernel; uniforms is (cycles x pfgs).
+        Gives the same populations as calling step once per cycle. Returns the populations per cycle.
+        """
+        if out is None:
+            out = np.empty((len(weather_codes), len(self)), dtype=np.int64)
+        self.population = _community_cycles(
+            self.population, np.asarray(weather_codes, dtype=np.int64), np.ascontiguousarray(uniforms, dtype=float),
+            self.water_per_individual, self.space_requirement, self.reproduction_gain, self.base_survival,
+            self.weather_stress, WATER_FACTOR, SPACE_FACTOR, float(max_water), float(max_space), out)
+        return out
+
+    def run(self, weather_codes, rng, max_water=MAX_WATER, max_space=MAX_SPACE, checkpoint=None):
+        """
+        Run over a sequence of weather codes; returns the (cycles x pfgs) population history.
+        With a checkpoint.Checkpointer, the populations, history so far and rng state are saved
+        between cycles, and a rerun with the same rng seed resumes bit-identically from the last one.
+        """
+        history = np.empty((len(weather_codes), len(self)), dtype=np.int64)
+        instrument.count("pfg.history_bytes", history.nbytes)
+        start = 0
+        if checkpoint is not None:
+            saved = checkpoint.load()
+            if saved is not None:
+                start = saved["next_cycle"]
+                history[:start] = saved["history"]
+                self.population = saved["population"]
+                rng.bit_generator.state = saved["rng_state"]
+        with instrument.stage("pfg.run", work=(len(weather_codes) - start) * len(self)):
+            cycle = start
+            while cycle < len(weather_codes):
+                if kernel_backend.active():
+                    # A block of cycles per kernel call; the (cycles x pfgs) uniforms are the same
+                    # stream as one rng.random(pfgs) draw per cycle
+                    stop = min(cycle + KERNEL_CYCLES, len(weather_codes))
+                    self.step_cycles(weather_codes[cycle:stop], rng.random((stop - cycle, len(self))),
+                                     max_water, max_space, out=history[cycle:stop])
+                else:
+                    stop = cycle + 1
+                    history[cycle] = self.step(weather_codes[cycle], rng.random(len(self)), max_water, max_space)
+                cycle = stop
+                if checkpoint is not None:
+                    checkpoint.maybe_save(lambda: {"next_cycle": cycle, "history": history[:cycle],
+                                                   "population": self.population,
+                                                   "rng_state": rng.bit_generator.state})
+        if checkpoint is not None:
+            checkpoint.done()
+        return history
+
+@kernel_backend.jit
+def _community_cycles(population, weather_codes, uniforms, water_per_individual, space_requirement,
+                      reproduction_gain, base_survival, weather_stress, water_factor, space_factor,
+                      max_water, max_space, out):
+    """Compiled PFGCommunity.step over several cycles (same operations and rounding); fills out."""
+    n = len(population)
+    population = population.copy()
+    water_demand = np.empty(n)
+    for c in range(len(weather_codes)):
+        code = weather_codes[c]
+        space_demand = 0
+        for i in range(n):
+            water_demand[i] = population[i] * water_per_individual[i]
+            space_demand += population[i] * space_requirement[i]
+        total_water_demand = kernel_backend.pairwise_sum(water_demand)
+        total_space_demand = float(space_demand)
+        water_availability = max(0.1, max_water * water_factor[code] / max(1.0, total_water_demand))
+        space_availability = max(0.1, max_space * space_factor[code] / max(1.0, total_space_demand))
+        resource_stress = min(2.0, max(0.2, (water_availability * space_availability) ** 0.5))
+
+        for i in range(n):
+            p = population[i]
+            combined_stress = resource_stress * weather_stress[code, i]
+            density_factor = max(0.1, 1.0 - (p / 1000.0))
+            births = p * reproduction_gain[i] * combined_stress * density_factor
+            survivors = p * (base_survival[i] * combined_stress)
+            p = np.int64(survivors + births)
+            # Extinction threshold: 30% chance to recover if nearly extinct
+            if 0 < p < 5 and uniforms[c, i] > 0.7:
+                p = max(1, np.int64(p * 0.5))
+            population[i] = max(0, p)
+        out[c] = population
+    return population
+
+def simulate_weather_codes(num_cycles, rng, irregular_probability=0.3):
+    """Weather pattern codes per cycle, drawn like simulate_weather_cycles."""
+    irregular = rng.random(num_cycles) < irregular_probability
+    return np.where(irregular, rng.choice(IRREGULAR_WEATHER, num_cycles), WEATHER_CODES['normal'])
+
+def weather_names(weather_codes):
+    return [WEATHER_TYPES[code] for code in weather_codes]
+
+# Probes for instrument.enable(["pfg"])
+instrument.register("pfg", PFGCommunity, "resource_stress", "step")
+
+if __name__ == '__main__':
+    import time
+
+    rng = np.random.default_rng(0)
+    community = PFGCommunity.random(2000, rng)
+    weather_codes = simulate_weather_codes(20000, rng)
+    start = time.time()
+    history = community.run(weather_codes, rng)
+    print(f"{len(community)} PFGs over {len(weather_codes)} cycles in {time.time() - start:.2f} s; "
+          f"{np.count_nonzero(history[-1])} groups persist")
@@ -0,0 +1,141 @@
+import csv
+import os
+from multiprocessing import Pool
+
+import numpy as np
+from scipy import stats
+
+import repo_root  # puts the repo root on sys.path for the shared modules
+from checkpoint import DEFAULT_CHECKPOINT_DIR, Checkpointer
+from sim_cache import SimCache, cache_key, code_version
+
+import pfg_metrics
+from pfg_community import PFGCommunity, simulate_weather_codes
+
+METRICS = ('survival_rate', 'extinction_count', 'final_total_pop', 'stress_recovery',
+           'stability_score', 'is_stable', 'viability_score')
+
+def run_replicate(num_pfgs, num_cycles, rng, variable_initial=True, irregular_probability=0.3):
+    """One stochastic realization; returns the (cycles x pfgs) history and the weather codes."""
+    community = PFGCommunity.random(num_pfgs, rng, variable_initial)
+    weather_codes = simulate_weather_codes(num_cycles, rng, irregular_probability)
+    return community.run(weather_codes, rng), weather_codes
+
+def viability_metrics(histories, weather_codes):
+    """
+    Viability metrics for a stack of replicates ((replicates x cycles x pfgs) histories), scored
+    like the pfg_simulation comparison. Returns {metric: array over replicates}.
+    """
+    final = histories[..., -1, :]
+    survival_rate = pfg_metrics.survival_rate(histories)
+    is_stable, _ = pfg_metrics.check_stability(histories)
+    stress_recovery = pfg_metrics.stress_recovery(histories, weather_codes)
+    stability_score = 1.0 / (1.0 + pfg_metrics.population_cv(histories))
+    return {
+        'survival_rate': survival_rate,
+        'extinction_count': np.sum(final == 0, axis=-1),
+        'final_total_pop': final.sum(axis=-1),
+        'stress_recovery': stress_recovery,
+        'stability_score': stability_score,
+        'is_stable': is_stable,
+        'viability_score': survival_rate * 0.3 + stress_recovery * 0.4 + stability_score * 0.3,
+    }
+
+def _run_chunk(args):
+    num_pfgs, num_cycles, seeds, sim_kwargs = args
+    runs = [run_replicate(num_pfgs, num_cycles, np.random.default_rng(s), **sim_kwargs) for s in seeds]
+    return viability_metrics(np.stack([r[0] for r in runs]), np.stack([r[1] for r in runs]))
+
+def run_ensemble(diversity_levels, n_replicates=200, num_cycles=100, seed=None, processes=None,
+                 chunk_size=50, checkpoint=None, **sim_kwargs):
+    """
+    Seeded replicates per diversity level across a process pool.
+    Every replicate has its own SeedSequence child, so results do not depend on chunking or
+    on the number of processes. Returns {num_pfgs: {metric: array over replicates}}.
+    With a checkpoint.Checkpointer, the metrics of finished chunks are saved as they arrive and
+    an interrupted run only recomputes the remaining chunks.
+    """
+    level_seeds = np.random.SeedSequence(seed).spawn(len(diversity_levels))
+    jobs = []
+    for num_pfgs, level_seed in zip(diversity_levels, level_seeds):
+        replicate_seeds = level_seed.spawn(n_replicates)
+        for start in range(0, n_replicates, chunk_size):
+            jobs.append((num_pfgs, num_cycles, replicate_seeds[start:start + chunk_size], sim_kwargs))
+
+    chunks = []
+    if checkpoint is not None:
+        saved = checkpoint.load()
+        if saved is not None:
+            chunks = saved["chunks"]
+            print(f"Resuming ensemble at chunk {len(chunks)}/{len(jobs)}")
+
+    def collect(results):
+        for chunk in results:
+            chunks.append(chunk)
+            if checkpoint is not None:
+                checkpoint.maybe_save(lambda: {"chunks": chunks})
+
+    pending = jobs[len(chunks):]
+    if len(pending) > 1 and processes != 1:
+        with Pool(processes) as pool:
+            collect(pool.imap(_run_chunk, pending))
+    else:
+        collect(map(_run_chunk, pending))
+    if checkpoint is not None:
+        checkpoint.done()
+
+    results = {num_pfgs: {metric: [] for metric in METRICS} for num_pfgs in diversity_levels}
+    for (num_pfgs, *_), chunk in zip(jobs, chunks):
+        for metric in METRICS:
+            results[num_pfgs][metric].append(chunk[metric])
+    return {num_pfgs: {metric: np.concatenate(values).astype(float) for metric, values in metrics.items()}
+            for num_pfgs, metrics in results.items()}
+
+def summarize(results, confidence=0.95):
+    """One row per (diversity level, metric): mean with a Student-t confidence interval."""
+    rows = []
+    for num_pfgs, metrics in results.items():
+        for metric, values in metrics.items():
+            n = len(values)
+            mean = values.mean()
+            half_width = stats.t.ppf(0.5 + confidence / 2, n - 1) * stats.sem(values) if n > 1 else np.nan
+            rows.append({'num_pfgs': num_pfgs, 'metric': metric, 'n': n, 'mean': mean,
+                         'ci_low': mean - half_width, 'ci_high': mean + half_width})
+    return rows
+
+def write_summary(rows, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['num_pfgs', 'metric', 'n', 'mean', 'ci_low', 'ci_high'])
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: (f"{v:.6g}" if isinstance(v, float) else v) for k, v in row.items()})
+
+if __name__ == '__main__':
+    import time
+
+    import pfg_community
+
+    diversity_levels = [3, 5, 10]
+    params = {"diversity_levels": diversity_levels, "n_replicates": 500, "num_cycles": 100}
+    version = code_version(__file__, pfg_community.__file__, pfg_metrics.__file__)
+    start = time.time()
+
+    def compute():
+        # An interrupted run resumes from its last checkpoint
+        checkpoint = Checkpointer(os.path.join(DEFAULT_CHECKPOINT_DIR, "pfg_ensemble.pkl"),
+                                  key=cache_key("pfg_ensemble", params, 2023, version=version))
+        results = run_ensemble(diversity_levels, n_replicates=500, num_cycles=100, seed=2023, checkpoint=checkpoint)
+        return {f"{metric}_{num_pfgs}": values for num_pfgs, metrics in results.items()
+                for metric, values in metrics.items()}
+
+    # Reuses the ensemble of an identical earlier run
+    flat = SimCache().cached("pfg_ensemble", compute, params, seed=2023, version=version)
+    results = {num_pfgs: {metric: flat[f"{metric}_{num_pfgs}"] for metric in METRICS} for num_pfgs in diversity_levels}
+    rows = summarize(results)
+    write_summary(rows, 'pfg_ensemble.csv')
+
+    scores = {row['num_pfgs']: row for row in rows if row['metric'] == 'viability_score'}
+    best = max(scores, key=lambda k: scores[k]['mean'])
+    print(f"{len(diversity_levels)} diversity levels x 500 replicates in {time.time() - start:.1f} s "
+          f"-> pfg_ensemble.csv; highest mean viability: {best} PFGs "
+          f"({scores[best]['mean']:.3f} [{scores[best]['ci_low']:.3f}, {scores[best]['ci_high']:.3f}])")
@@ -0,0 +1,70 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from pfg_community import WEATHER_CODES
+
+# Population histories are (cycles x pfgs) arrays, or (replicates x cycles x pfgs) for a whole
+# ensemble; weather is the matching (cycles,) or (replicates x cycles) array of weather codes.
+# Every metric reduces over the last two axes, so an ensemble is analysed in one call.
+
+def stress_mask(weather):
+    """True for drought, severe drought and flood cycles (codes or weather names)."""
+    weather = np.asarray(weather)
+    if weather.dtype.kind in 'US':
+        return weather != 'normal'
+    return weather != WEATHER_CODES['normal']
+
+def rolling_cv(history, window=20):
+    """Coefficient of variation of every PFG over each trailing window: (..., cycles-window+1, pfgs)."""
+    windows = sliding_window_view(np.asarray(history, dtype=float), window, axis=-2)
+    mean = windows.mean(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(mean > 0, windows.std(axis=-1) / mean, np.nan)
+
+def check_stability(history, window=20, threshold=0.1):
+    """
+    Stability over the last window cycles: every PFG that is not extinct over the window has
+    CV <= threshold. Returns (is_stable, proportions) where proportions are the final population
+    shares (zero for a zero final total).
+    """
+    history = np.asarray(history, dtype=float)
+    if history.shape[-2] < window:
+        return np.zeros(history.shape[:-2], dtype=bool), np.zeros(history.shape[:-2] + history.shape[-1:])
+    cv = rolling_cv(history[..., -window:, :], window)[..., -1, :]
+    is_stable = ~np.any(cv > threshold, axis=-1)
+    final = history[..., -1, :]
+    total = final.sum(axis=-1, keepdims=True)
+    proportions = np.divide(final, total, out=np.zeros_like(final), where=total > 0)
+    return is_stable, proportions
+
+def population_cv(history, window=20):
+    """Mean CV over the last window cycles of the PFGs that are not extinct over it (0 if none)."""
+    history = np.asarray(history, dtype=float)
+    if history.shape[-2] < 2:
+        return np.zeros(history.shape[:-2])
+    cv = rolling_cv(history[..., -window:, :], min(window, history.shape[-2]))[..., -1, :]
+    alive = ~np.isnan(cv)
+    count = alive.sum(axis=-1)
+    return np.where(count > 0, np.where(alive, cv, 0.0).sum(axis=-1) / np.maximum(count, 1), 0.0)
+
+def stress_recovery(history, weather, horizon=3, cap=2.0):
+    """
+    Mean over stress events and surviving PFGs of (mean population over the next horizon cycles)
+    / (population at the event), capped at cap; 1.0 when there are no such events.
+    """
+    history = np.asarray(history, dtype=float)
+    cycles = history.shape[-2]
+    if cycles < 5:
+        return np.ones(history.shape[:-2])
+    n_events = cycles - horizon
+    cumulative = np.cumsum(history, axis=-2)
+    # Sum of cycles i+1 .. i+horizon for every event cycle i
+    following = cumulative[..., horizon:horizon + n_events, :] - cumulative[..., :n_events, :]
+    at_event = history[..., :n_events, :]
+    mask = stress_mask(weather)[..., :n_events, None] & (at_event > 0)
+    ratio = np.minimum(cap, (following / horizon) / np.maximum(1, at_event))
+    count = mask.sum(axis=(-2, -1))
+    return np.where(count > 0, np.where(mask, ratio, 0.0).sum(axis=(-2, -1)) / np.maximum(count, 1), 1.0)
+
+def survival_rate(history):
+    """Fraction of PFGs alive at the final cycle."""
+    return np.count_nonzero(np.asarray(history)[..., -1, :], axis=-1) / np.shape(history)[-1]
@@ -1,5 +1,15 @@
+import os
 import random
+import sys
+import numpy as np
 import matplotlib.pyplot as plt
+import repo_root  # puts the repo root on sys.path for the shared modules
+import instrument
+from checkpoint import DEFAULT_CHECKPOINT_DIR, Checkpointer
+from sim_cache import SimCache, cache_key, code_version
+
+from pfg_community import PFGCommunity, WEATHER_CODES
+import pfg_metrics
 
 class PlantFunctionalGroup:
     def __init__(self, name, drought_resistance, water_requirement, lifespan, space_requirement):
@@ -155,8 +165,24 @@ def simulate_weather_cycles(num_cycles, irregular_probability=0.3):
     return weather_data
 
 
-def run_simulation(num_pfgs, num_cycles, variable_initial=True, irregular_probability=0.3):
-    """Run the full simulation and track populations through weather cycles"""
+# Logging verbosity for run_simulation
+QUIET, SUMMARY, VERBOSE = 0, 1, 2
+SEED = 2023
+
+
+def run_simulation(num_pfgs, num_cycles, variable_initial=True, irregular_probability=0.3,
+                   headless=False, verbosity=None, log=print, checkpoint=None):
+    """
+    Run the full simulation and track populations through weather cycles.
+
+    Messages go to the log sink (any callable taking a string): QUIET logs nothing, SUMMARY the
+    header and per-block totals, VERBOSE also every PFG. headless=True defaults to QUIET and
+    returns the history as the preallocated (cycles x pfgs) integer array instead of a dict.
+    With a checkpoint.Checkpointer, the populations, history so far and rng state are saved
+    between cycles; a rerun after random.seed with the same seed resumes bit-identically.
+    """
+    if verbosity is None:
+        verbosity = QUIET if headless else VERBOSE
     pfgs = generate_random_pfgs(num_pfgs, variable_initial=variable_initial)
     weather_data = simulate_weather_cycles(num_cycles, irregular_probability)
     
@@ -164,53 +190,104 @@ def run_simulation(num_pfgs, num_cycles, variable_initial=True, irregular_probab
     max_water = 10000  # Total water available
     max_space = 5000   # Total space available
     
-    # Track population history
-    population_history = {pfg.name: [] for pfg in pfgs}
-    
-    print(f"\n{'='*80}")
-    print(f"SIMULATION: {num_pfgs} PFGs over {num_cycles} weather cycles")
-    print(f"{'='*80}")
-    print(f"\nInitial PFGs:")
-    for pfg in pfgs:
-        print(f"  {pfg}")
-    
-    # Run simulation for each weather cycle
-    for cycle, weather in enumerate(weather_data):
-        # Calculate total resource demand from ALL species
-        total_water_demand = sum(pfg.calculate_water_demand() for pfg in pfgs)
-        total_space_demand = sum(pfg.calculate_space_demand() for pfg in pfgs)
-        
-        # Scale available resources based on weather
-        if weather == 'drought':
-            available_water = max_water * 0.4
-        elif weather == 'severe_drought':
-            available_water = max_water * 0.2
-        else:
-            available_water = max_water
-        
-        if weather == 'flood':
-            available_space = max_space * 0.6  # Flooding reduces usable space
-        else:
-            available_space = max_space
-        
-        # Update each PFG's population based on resources and weather
+    if verbosity >= SUMMARY:
+        log(f"\n{'='*80}")
+        log(f"SIMULATION: {num_pfgs} PFGs over {num_cycles} weather cycles")
+        log(f"{'='*80}")
+    if verbosity >= VERBOSE:
+        log(f"\nInitial PFGs:")
         for pfg in pfgs:
-            pfg.update_population(weather, total_water_demand, total_space_demand, available_water, available_space)
-            population_history[pfg.name].append(pfg.population)
-        
-        # Print cycle summary every 10 cycles or at the end
-        if (cycle + 1) % max(1, num_cycles // 10) == 0 or cycle == num_cycles - 1:
-            print(f"\nCycle {cycle + 1} (Weather: {weather:15s}):")
-            total_pop = sum(pfg.population for pfg in pfgs)
-            print(f"  Total population: {total_pop}")
-            for pfg in pfgs:
-                print(f"    {pfg.name}: {pfg.population:5d}")
-    
+            log(f"  {pfg}")
+    
+    # All PFGs advance together in the array-backed community; the near-extinction draws come
+    # from a generator seeded off `random` so random.seed still reproduces a run
+    community = PFGCommunity.from_pfgs(pfgs)
+    rng = np.random.default_rng(random.getrandbits(64))
+    history = np.empty((num_cycles, num_pfgs), dtype=np.int64)
+    instrument.count("pfg.history_bytes", history.nbytes)
+    start = 0
+    if checkpoint is not None:
+        saved = checkpoint.load()
+        if saved is not None:
+            start = saved["next_cycle"]
+            history[:start] = saved["history"]
+            community.population = saved["population"]
+            rng.bit_generator.state = saved["rng_state"]
+            if verbosity >= SUMMARY:
+                log(f"\nResuming at cycle {start}/{num_cycles}")
+
+    # Run simulation for each weather cycle
+    for cycle in range(start, num_cycles):
+        weather = weather_data[cycle]
+        with instrument.stage("pfg.cycle", work=num_pfgs):
+            history[cycle] = community.step(WEATHER_CODES[weather], rng.random(num_pfgs), max_water, max_space)
+
+        # Log cycle summary every 10 cycles or at the end
+        if verbosity >= SUMMARY and ((cycle + 1) % max(1, num_cycles // 10) == 0 or cycle == num_cycles - 1):
+            log(f"\nCycle {cycle + 1} (Weather: {weather:15s}):")
+            log(f"  Total population: {history[cycle].sum()}")
+            if verbosity >= VERBOSE:
+                for pfg, population in zip(pfgs, history[cycle].tolist()):
+                    log(f"    {pfg.name}: {population:5d}")
+        if checkpoint is not None:
+            checkpoint.maybe_save(lambda: {"next_cycle": cycle + 1, "history": history[:cycle + 1],
+                                           "population": community.population,
+                                           "rng_state": rng.bit_generator.state})
+    if checkpoint is not None:
+        checkpoint.done()
+
+    for pfg, population in zip(pfgs, community.population.tolist()):
+        pfg.population = population
+    if headless:
+        return pfgs, history, weather_data
+
+    # Track population history
+    population_history = {pfg.name: pops for pfg, pops in zip(pfgs, history.T.tolist())}
     return pfgs, population_history, weather_data
 
 
-def plot_population_dynamics(population_history, pfg_names, weather_data, title="PFG Population Dynamics Over Weather Cycles"):
-    """Plot the population dynamics of all PFGs with weather cycles on x-axis"""
+def cached_simulation(num_pfgs, num_cycles, variable_initial=True, irregular_probability=0.3, seed=SEED,
+                      verbosity=VERBOSE, log=print):
+    """
+    Seeded run_simulation through the shared result cache; returns (pfgs, population_history,
+    weather_data) like run_simulation. The log only runs when the simulation is computed, and a
+    run interrupted before reaching the cache resumes from its checkpoint.
+    """
+    import pfg_community
+
+    params = {"num_pfgs": num_pfgs, "num_cycles": num_cycles, "variable_initial": variable_initial,
+              "irregular_probability": irregular_probability}
+    version = code_version(__file__, pfg_community.__file__)
+
+    def compute():
+        random.seed(seed)
+        checkpoint = Checkpointer(os.path.join(DEFAULT_CHECKPOINT_DIR, "pfg_simulation.pkl"),
+                                  key=cache_key("pfg_simulation", params, seed, version=version))
+        pfgs, history, weather_data = run_simulation(num_pfgs, num_cycles, variable_initial, irregular_probability,
+                                                     headless=True, verbosity=verbosity, log=log,
+                                                     checkpoint=checkpoint)
+        traits = [[p.drought_resistance, p.water_requirement, p.lifespan, p.space_requirement] for p in pfgs]
+        return {"traits": np.array(traits, dtype=np.int64).reshape(num_pfgs, 4), "history": history,
+                "population": [p.population for p in pfgs],
+                "weather": np.array([WEATHER_CODES[w] for w in weather_data], dtype=np.int64)}
+
+    cached = SimCache().cached("pfg_simulation", compute, params, seed=seed, version=version)
+    pfgs = [PlantFunctionalGroup(f"PFG_{i+1}", *traits) for i, traits in enumerate(cached["traits"].tolist())]
+    for pfg, population in zip(pfgs, cached["population"].tolist()):
+        pfg.population = population
+    population_history = {pfg.name: pops for pfg, pops in zip(pfgs, cached["history"].T.tolist())}
+    return pfgs, population_history, pfg_community.weather_names(cached["weather"])
+
+
+def plot_population_dynamics(population_history, pfg_names, weather_data, title="PFG Population Dynamics Over Weather Cycles",
+                             show=True):
+    """
+    Plot the population dynamics of all PFGs with weather cycles on x-axis.
+    population_history may be the dict or the (cycles x pfgs) array from run_simulation.
+    With show=False the figure is returned for the caller to show or save later.
+    """
+    if isinstance(population_history, np.ndarray):
+        population_history = dict(zip(pfg_names, population_history.T))
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10), gridspec_kw={'height_ratios': [3, 1]})
     
     # Main plot: Population dynamics
@@ -248,7 +325,14 @@ def plot_population_dynamics(population_history, pfg_names, weather_data, title=
     ax2.legend(handles=legend_elements, loc='upper right', fontsize=9)
     
     plt.tight_layout()
-    plt.show()
+    if show:
+        plt.show()
+    return fig
+
+
+def _history_array(population_history, pfg_names=None):
+    names = list(population_history) if pfg_names is None else pfg_names
+    return np.array([population_history[name] for name in names]).T
 
 
 def check_stability(population_history, pfg_names, stability_window=20, threshold=0.1):
@@ -260,35 +344,17 @@ def check_stability(population_history, pfg_names, stability_window=20, threshol
     if len(population_history[pfg_names[0]]) < stability_window:
         return False, {}
     
-    is_stable = True
-    proportions = {}
-    
-    for pfg_name in pfg_names:
-        last_n = population_history[pfg_name][-stability_window:]
-        avg = sum(last_n) / len(last_n)
-        
-        # Check for zero population (extinction)
-        if avg == 0:
-            proportions[pfg_name] = 0.0
-            continue
-        
-        # Calculate coefficient of variation
-        variance = sum((x - avg) ** 2 for x in last_n) / len(last_n)
-        std_dev = variance ** 0.5
-        cv = std_dev / avg if avg > 0 else float('inf')
-        
-        # If CV is too high, system is unstable
-        if cv > threshold:
-            is_stable = False
+    history = _history_array(population_history, pfg_names)
+    is_stable, shares = pfg_metrics.check_stability(history, stability_window, threshold)
     
-    # Calculate final proportions (if stable)
+    # Extinct PFGs (zero average) always report 0; all PFGs get their final share if stable
+    extinct = history[-stability_window:].sum(axis=0) == 0
     if is_stable:
-        total_pop = sum(population_history[pfg_name][-1] for pfg_name in pfg_names)
-        if total_pop > 0:
-            for pfg_name in pfg_names:
-                proportions[pfg_name] = population_history[pfg_name][-1] / total_pop
-    
-    return is_stable, proportions
+        proportions = dict(zip(pfg_names, shares.tolist())) if history[-1].sum() > 0 else {}
+        proportions.update({name: 0.0 for name, e in zip(pfg_names, extinct) if e and name not in proportions})
+    else:
+        proportions = {name: 0.0 for name, e in zip(pfg_names, extinct) if e}
+    return bool(is_stable), proportions
 
 
 def print_stability_and_proportions(pfgs, population_history):
@@ -323,42 +389,18 @@ def calculate_stress_recovery(population_history, weather_data):
     """Calculate how well populations recover after stress events (drought/flood)"""
     if len(weather_data) < 5:
         return 1.0
-    
-    recovery_scores = []
-    
-    # Find stress events and measure recovery in next few cycles
-    for i in range(len(weather_data) - 3):
-        if weather_data[i] in ['drought', 'severe_drought', 'flood']:
-            # Get populations during and after stress
-            for pfg_name in list(population_history.keys()):
-                if i < len(population_history[pfg_name]):
-                    stress_pop = population_history[pfg_name][i]
-                    recovery_pop = sum(population_history[pfg_name][i+1:min(i+4, len(population_history[pfg_name]))]) / 3
-                    
-                    if stress_pop > 0:
-                        recovery_ratio = recovery_pop / max(1, stress_pop)
-                        recovery_scores.append(min(2.0, recovery_ratio))  # Cap at 2x recovery
-    
-    # Average recovery score across all stress events
-    return sum(recovery_scores) / len(recovery_scores) if recovery_scores else 1.0
+    return float(pfg_metrics.stress_recovery(_history_array(population_history), weather_data))
 
 
 def calculate_population_variance(population_history):
     """Calculate variance in populations (lower = more stable)"""
-    variances = []
-    
-    for pfg_name, pops in population_history.items():
-        if len(pops) > 1:
-            last_20 = pops[-20:] if len(pops) >= 20 else pops
-            avg = sum(last_20) / len(last_20)
-            
-            if avg > 0:
-                var = sum((p - avg) ** 2 for p in last_20) / len(last_20)
-                cv = (var ** 0.5) / avg  # Coefficient of variation
-                variances.append(cv)
-    
-    # Return average variance (lower is better for stability)
-    return sum(variances) / len(variances) if variances else 0.0
+    return float(pfg_metrics.population_cv(_history_array(population_history)))
+
+
+# Probes for instrument.enable(["pfg"]) / (["plot"])
+instrument.register("pfg", PlantFunctionalGroup, "calculate_resource_stress", "update_population")
+instrument.register("pfg", sys.modules[__name__], "generate_random_pfgs", "simulate_weather_cycles")
+instrument.register("plot", sys.modules[__name__], "plot_population_dynamics")
 
 
 # Example usage
@@ -372,7 +414,8 @@ if __name__ == '__main__':
         print(f"RUNNING SIMULATION WITH {num_pfgs} PFGs")
         print(f"{'#'*80}")
         
-        pfgs, population_history, weather_data = run_simulation(
+        # Reuses the run of an identical earlier invocation
+        pfgs, population_history, weather_data = cached_simulation(
             num_pfgs=num_pfgs,
             num_cycles=100,
             variable_initial=True,  # Random starting populations
@@ -382,7 +425,8 @@ if __name__ == '__main__':
         # Plot results (one plot per diversity level)
         pfg_names = [pfg.name for pfg in pfgs]
         plot_population_dynamics(population_history, pfg_names, weather_data,
-                                 title=f"Population Dynamics: {num_pfgs} PFGs over 100 Weather Cycles (Variable Initial Populations)")
+                                 title=f"Population Dynamics: {num_pfgs} PFGs over 100 Weather Cycles (Variable Initial Populations)",
+                                 show=False)
         
         # Analyze stability and proportions
         is_stable, proportions = print_stability_and_proportions(pfgs, population_history)
@@ -471,44 +515,5 @@ if __name__ == '__main__':
     print(f"  - Maintain population stability over time")
     print(f"  - Ensure long-term species persistence")
 
-
-def calculate_stress_recovery(population_history, weather_data):
-    """Calculate how well populations recover after stress events (drought/flood)"""
-    if len(weather_data) < 5:
-        return 1.0
-    
-    recovery_scores = []
-    
-    # Find stress events and measure recovery in next few cycles
-    for i in range(len(weather_data) - 3):
-        if weather_data[i] in ['drought', 'severe_drought', 'flood']:
-            # Get populations during and after stress
-            for pfg_name in list(population_history.keys()):
-                if i < len(population_history[pfg_name]):
-                    stress_pop = population_history[pfg_name][i]
-                    recovery_pop = sum(population_history[pfg_name][i+1:min(i+4, len(population_history[pfg_name]))]) / 3
-                    
-                    if stress_pop > 0:
-                        recovery_ratio = recovery_pop / max(1, stress_pop)
-                        recovery_scores.append(min(2.0, recovery_ratio))  # Cap at 2x recovery
-    
-    # Average recovery score across all stress events
-    return sum(recovery_scores) / len(recovery_scores) if recovery_scores else 1.0
-
-
-def calculate_population_variance(population_history):
-    """Calculate variance in populations (lower = more stable)"""
-    variances = []
-    
-    for pfg_name, pops in population_history.items():
-        if len(pops) > 1:
-            last_20 = pops[-20:] if len(pops) >= 20 else pops
-            avg = sum(last_20) / len(last_20)
-            
-            if avg > 0:
-                var = sum((p - avg) ** 2 for p in last_20) / len(last_20)
-                cv = (var ** 0.5) / avg  # Coefficient of variation
-                variances.append(cv)
-    
-    # Return average variance (lower is better for stability)
-    return sum(variances) / len(variances) if variances else 0.0
\ No newline at end of file
+    # Figures were deferred so the analysis is not blocked by plot windows
+    plt.show()
@@ -0,0 +1,10 @@
+"""
+Puts the repository root on sys.path so the shared modules (instrument, kernel_backend,
+checkpoint, sim_cache) import from this project folder. Import it before any of them.
+"""
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
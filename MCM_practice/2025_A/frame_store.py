@@ -0,0 +1,186 @@
+import json
+import os
+import shutil
+import multiprocessing
+import sys
+
+import numpy as np
+
+import repo_root  # puts the repo root on sys.path for the shared modules
+import instrument
+
+class FrameStore:
+    """
+    On-disk store of staircase wear snapshots.
+    Each frame is a compressed .npz holding the float32 change since the previous frame, with a
+    full float32 keyframe every keyframe_interval frames so any frame is rebuilt from at most
+    keyframe_interval files. Deltas are taken against the decoded previous frame, so float32
+    rounding never accumulates.
+    """
+    def __init__(self, path, width=None, depth=None, height=None, keyframe_interval=10, overwrite=False):
+        """
+        Open the store at path, or create it in a new or empty directory. A directory holding
+        anything other than a store is only cleared with overwrite=True (which also discards an
+        existing store); otherwise FileExistsError is raised.
+        """
+        self.path = path
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path) and not overwrite:
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+        else:
+            if os.path.isdir(path) and os.listdir(path):
+                if not overwrite:
+                    raise FileExistsError(f"{path} is not empty and holds no frame store; "
+                                          "pass overwrite=True to replace it")
+                shutil.rmtree(path)
+            os.makedirs(path, exist_ok=True)
+            self.meta = {"width": width, "depth": depth, "height": height,
+                         "keyframe_interval": keyframe_interval, "frames": []}
+            self._write_meta()
+        self._last = None
+        self._cache = (None, None)  # (frame index, decoded wear) for sequential reads
+
+    def _write_meta(self):
+        tmp_path = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, os.path.join(self.path, "meta.json"))
+
+    def _frame_path(self, k):
+        return os.path.join(self.path, f"frame_{k:06d}.npz")
+
+    def __len__(self):
+        return len(self.meta["frames"])
+
+    def append(self, wear, steps, volume=None):
+        """Store the wear of all stairs (num_stairs x res x res) after `steps` pedestrians."""
+        k = len(self)
+        wear = np.asarray(wear, dtype=np.float32)
+        if self._last is None and k > 0:
+            self._last = self.load(k - 1)
+        if k % self.meta["keyframe_interval"] == 0:
+            np.savez_compressed(self._frame_path(k), key=wear)
+            self._last = wear.copy()
+        else:
+            delta = wear - self._last
+            np.savez_compressed(self._frame_path(k), delta=delta)
+            self._last = self._last + delta
+        instrument.count("wear.frame_bytes", os.path.getsize(self._frame_path(k)))
+        self.meta["frames"].append({"steps": int(steps), "volume": None if volume is None else float(volume)})
+        self._write_meta()
+
+    def load(self, k):
+        """Decode frame k as a float32 (num_stairs x res x res) array."""
+        if not 0 <= k < len(self):
+            raise IndexError(f"Frame {k} out of range [0, {len(self)})")
+        cached_k, cached = self._cache
+        interval = self.meta["keyframe_interval"]
+        if cached_k is not None and cached_k <= k and cached_k // interval == k // interval:
+            start, wear = cached_k + 1, cached.copy()
+        else:
+            start = k - k % interval
+            with np.load(self._frame_path(start)) as data:
+                wear = data["key"]
+            start += 1
+        for j in range(start, k + 1):
+            with np.load(self._frame_path(j)) as data:
+                wear = wear + data["delta"]
+        self._cache = (k, wear)
+        return wear.copy()
+
+    def info(self, k):
+        return self.meta["frames"][k]
+
+def stair_surfaces(store, wear):
+    """Per-stair (X, Y, Z) surfaces with the Markov state offsets used by the staircase scripts."""
+    width, depth, height = store.meta["width"], store.meta["depth"], store.meta["height"]
+    res = wear.shape[-1]
+    X, Y = np.meshgrid(np.linspace(-width/2, width/2, res, dtype=np.float32),
+                       np.linspace(0, depth, res, dtype=np.float32))
+    return [(X, Y + i * depth, (height - wear[i]) + i * height) for i in range(len(wear))]
+
+def render_frame(store, k, out_path, max_vis_wear=0.02):
+    """Render one frame of the store to an image file with matplotlib (current backend)."""
+    import matplotlib.pyplot as plt
+
+    wear = store.load(k)
+    fig = plt.figure(figsize=(8, 8))
+    ax = fig.add_subplot(projection="3d")
+    for (X, Y, Z), w in zip(stair_surfaces(store, wear), wear):
+        colors = plt.cm.magma(np.clip(w / max_vis_wear, 0, 1))
+        ax.plot_surface(X, Y, Z, facecolors=colors, rstride=1, cstride=1, linewidth=0, shade=False)
+    info = store.info(k)
+    volume = "" if info["volume"] is None else f" | Total Vol Lost: {info['volume']:.5f} m3"
+    ax.set_title(f"Steps: {info['steps']}{volume}")
+    ax.view_init(elev=30, azim=-45)
+    fig.savefig(out_path, dpi=100)
+    plt.close(fig)
+    return out_path
+
+def _init_render_worker():
+    # Render workers never show figures; switching here leaves the parent's backend alone
+    import matplotlib
+    matplotlib.use("Agg")
+
+def _render_job(args):
+    store_path, k, out_path, max_vis_wear = args
+    return render_frame(FrameStore(store_path), k, out_path, max_vis_wear)
+
+def render_frames(store, out_dir, frames=None, processes=None, max_vis_wear=0.02):
+    """
+    Render frames (default: all) to PNG files in parallel; returns the image paths.
+    Workers are forked so that the unguarded staircase scripts are not re-executed in them;
+    where fork is unavailable frames are rendered serially.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    frames = range(len(store)) if frames is None else frames
+    jobs = [(store.path, k, os.path.join(out_dir, f"frame_{k:06d}.png"), max_vis_wear) for k in frames]
+    if len(jobs) > 1 and processes != 1 and "fork" in multiprocessing.get_all_start_methods():
+        with multiprocessing.get_context("fork").Pool(processes, initializer=_init_render_worker) as pool:
+            return pool.map(_render_job, jobs)
+    return [_render_job(job) for job in jobs]
+
+def render_animation(store, out_file, frames=None, fps=5, processes=None, max_vis_wear=0.02):
+    """Render frames in parallel and assemble them into a single GIF."""
+    from PIL import Image
+
+    image_dir = os.path.splitext(out_file)[0] + "_frames"
+    paths = render_frames(store, image_dir, frames, processes, max_vis_wear)
+    images = [Image.open(p) for p in paths]
+    images[0].save(out_file, save_all=True, append_images=images[1:], duration=int(1000 / fps), loop=0)
+    return out_file
+
+def plotly_animation(store, max_frames=10, max_vis_wear=0.02, title="Full Staircase Markov Drift Simulation"):
+    """Interactive plotly animation over at most max_frames evenly spaced frames, decoded lazily."""
+    import plotly.graph_objects as go
+
+    frame_ids = np.unique(np.linspace(0, len(store) - 1, min(max_frames, len(store))).astype(int))
+    frames = []
+    for k in frame_ids:
+        wear = store.load(k)
+        info = store.info(k)
+        surfaces = [go.Surface(x=X, y=Y, z=Z, surfacecolor=wear[i], colorscale='Magma',
+                               cmin=0, cmax=max_vis_wear, showscale=(i == 0), name=f"Stair {i}")
+                    for i, (X, Y, Z) in enumerate(stair_surfaces(store, wear))]
+        volume = "" if info["volume"] is None else f" | Total Vol Lost: {info['volume']:.5f} m3"
+        frames.append(go.Frame(data=surfaces, name=str(info["steps"]),
+                               layout=go.Layout(annotations=[dict(text=f"Steps: {info['steps']}{volume}",
+                                                                  x=0, y=1, showarrow=False)])))
+
+    zero = np.zeros_like(store.load(0))
+    initial_data = [go.Surface(x=X, y=Y, z=Z, colorscale='Magma', cmin=0, cmax=max_vis_wear)
+                    for X, Y, Z in stair_surfaces(store, zero)]
+    fig = go.Figure(data=initial_data, frames=frames)
+    sliders = [dict(
+        steps=[dict(method='animate', args=[[f.name], dict(mode='immediate', frame=dict(duration=0, redraw=True))], label=f.name) for f in frames],
+        active=0, transition={'duration': 0}, x=0, len=1.0
+    )]
+    fig.update_layout(
+        title=title,
+        scene=dict(aspectmode="data", camera=dict(eye=dict(x=2, y=-2, z=2))),
+        sliders=sliders
+    )
+    return fig
+
+instrument.register("plot", sys.modules[__name__], "render_frame", "render_animation", "plotly_animation")
@@ -1,7 +1,16 @@
+import os
 import numpy as np
-import plotly.graph_objects as go
 import random
-from stair_damage_evaluator import evaluate_stair_damage
+
+import repo_root  # puts the repo root on sys.path for the shared modules
+import instrument
+from checkpoint import DEFAULT_CHECKPOINT_DIR, Checkpointer
+from sim_cache import SimCache, cache_key, code_version
+
+from stair_damage_evaluator import verify_volume_totals
+from wear_engine import WearEngine
+from frame_store import FrameStore, plotly_animation, render_animation
+from wear_feedback import WearFeedback
 
 WIDTH, DEPTH, HEIGHT = 0.30, 0.30, 0.18
 GRID_RES = 50 
@@ -9,82 +18,84 @@ NUM_STAIRS = 5
 NUM_FRAMES = 30
 STEPS_PER_FRAME = 50 
 MAX_VIS_WEAR = 0.02 
+MAX_INTERACTIVE_FRAMES = 10
+EXPORT_ANIMATION = False
+VERIFY_VOLUMES = False  # cross-check the running volume totals against full-grid integration
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stair_output", "full_staircase")
 WEAR_RATE = 0.000055
+FEEDBACK_SENSITIVITY = 0.0  # > 0: people follow worn depressions, < 0: avoid them, 0: no feedback
+SEED = 2025
 
-def create_stair_geometry(stair_idx, wear_matrix):
-    x_vals = np.linspace(-WIDTH/2, WIDTH/2, GRID_RES)
-    y_vals = np.linspace(0, DEPTH, GRID_RES)
-    X, Y = np.meshgrid(x_vals, y_vals)
-    
-    Z_offset = stair_idx * HEIGHT
-    Y_offset = stair_idx * DEPTH
-    
-    Z_surface = (HEIGHT - wear_matrix) + Z_offset
-    return X, Y + Y_offset, Z_surface
-
-def get_footprint_impact(X, Y, cx, cy):
-    rx, ry = (X - cx) / 0.055, (Y - cy) / 0.125
-    R = np.sqrt(rx**2 + ry**2)
-    return np.maximum(0, 1 - R)**2
-
-stair_wear_data = [np.zeros((GRID_RES, GRID_RES)) for _ in range(NUM_STAIRS)]
-frames = []
-total_steps = 0
-
-drift_profiles = [1.5 if (i == 0 or i == NUM_STAIRS-1) else 1.0 for i in range(NUM_STAIRS)]
-
-for f in range(NUM_FRAMES):
-    for _ in range(STEPS_PER_FRAME):
-        total_steps += 1
-        current_x = (np.random.beta(3, 3) - 0.5) * WIDTH 
+def simulate_frames(checkpoint=None):
+    """
+    Footstep loop over all frames. With a checkpoint.Checkpointer the engine, feedback, rng and
+    frames so far are saved between frames, and an interrupted run resumes bit-identically.
+    """
+    rng = np.random.default_rng(SEED)
+    drift_profiles = [1.5 if (i == 0 or i == NUM_STAIRS-1) else 1.0 for i in range(NUM_STAIRS)]
+    engine = WearEngine(NUM_STAIRS, GRID_RES, WIDTH, DEPTH, WEAR_RATE, drift_profiles)
+    feedback = WearFeedback(engine, FEEDBACK_SENSITIVITY) if FEEDBACK_SENSITIVITY else None
+    frames = np.empty((NUM_FRAMES, NUM_STAIRS, GRID_RES, GRID_RES), dtype=np.float32)
+    steps = np.empty(NUM_FRAMES, dtype=np.int64)
+    volumes = np.empty(NUM_FRAMES)
+    total_steps = 0
+    start = 0
+    if checkpoint is not None:
+        saved = checkpoint.load()
+        if saved is not None:
+            start, rng, engine, feedback, frames, steps, volumes, total_steps = (
+                saved["next_frame"], saved["rng"], saved["engine"], saved["feedback"],
+                saved["frames"], saved["steps"], saved["volumes"], saved["total_steps"])
+            print(f"Resuming staircase simulation at frame {start}/{NUM_FRAMES}")
 
-        for i in range(NUM_STAIRS):
-            wobble = np.random.normal(0, 0.02) 
-            current_x = np.clip(current_x + wobble, -WIDTH/2, WIDTH/2)
-            current_y = np.random.beta(2, 5) * 0.25 
-            x_lin = np.linspace(-WIDTH/2, WIDTH/2, GRID_RES)
-            y_lin = np.linspace(0, DEPTH, GRID_RES)
-            tx, ty = np.meshgrid(x_lin, y_lin)
-            rx = (tx - current_x) / 0.055
-            ry = (ty - current_y) / 0.125
-            R = np.sqrt(rx**2 + ry**2)
-            impact = np.maximum(0, 1 - R)**2
+    for f in range(start, NUM_FRAMES):
+        total_steps += STEPS_PER_FRAME
+        with instrument.stage("wear.frame", work=NUM_STAIRS * STEPS_PER_FRAME):
+            current_x = (rng.beta(3, 3, STEPS_PER_FRAME) - 0.5) * WIDTH
 
-            stair_wear_data[i] += (WEAR_RATE * drift_profiles[i]) * impact
+            for i in range(NUM_STAIRS):
+                wobble = rng.normal(0, 0.02, STEPS_PER_FRAME)
+                current_x = np.clip(current_x + wobble, -WIDTH/2, WIDTH/2)
+                current_y = rng.beta(2, 5, STEPS_PER_FRAME) * 0.25
+                if feedback is not None:
+                    current_x, current_y = feedback.step(i, current_x, current_y)
+                else:
+                    engine.deposit_batch(i, current_x, current_y)
 
-    frame_surfaces = []
-    current_total_vol = 0
-    
-    for i in range(NUM_STAIRS):
-        X_p, Y_p, Z_p = create_stair_geometry(i, stair_wear_data[i])
-        frame_surfaces.append(go.Surface(
-            x=X_p, y=Y_p, z=Z_p,
-            surfacecolor=stair_wear_data[i],
-            colorscale='Magma', cmin=0, cmax=MAX_VIS_WEAR,
-            showscale=(i == 0),
-            name=f"Stair {i}"
-        ))
-        current_total_vol += evaluate_stair_damage(X_p, Y_p, Z_p - (i * HEIGHT), HEIGHT)
+        # Running totals kept by the engine; no per-frame surface integration
+        frames[f] = engine.wear
+        steps[f] = total_steps
+        volumes[f] = engine.volume.sum()
+        if checkpoint is not None:
+            # engine and feedback are pickled together, so feedback still refers to this engine
+            checkpoint.maybe_save(lambda: {"next_frame": f + 1, "rng": rng, "engine": engine, "feedback": feedback,
+                                           "frames": frames, "steps": steps, "volumes": volumes,
+                                           "total_steps": total_steps})
+    if checkpoint is not None:
+        checkpoint.done()
 
-    status_text = f"Steps: {total_steps} | Total Vol Lost: {current_total_vol:.5f} m3"
-    frames.append(go.Frame(data=frame_surfaces, name=str(total_steps),
-                           layout=go.Layout(annotations=[dict(text=status_text, x=0, y=1, showarrow=False)])))
+    if VERIFY_VOLUMES:
+        verify_volume_totals(engine, HEIGHT)
+    return {"wear": frames, "steps": steps, "volume": volumes}
 
-initial_data = []
-for i in range(NUM_STAIRS):
-    X_p, Y_p, Z_p = create_stair_geometry(i, np.zeros((GRID_RES, GRID_RES)))
-    initial_data.append(go.Surface(x=X_p, y=Y_p, z=Z_p, colorscale='Magma', cmin=0, cmax=MAX_VIS_WEAR))
+# Reuses the frames of an identical earlier run (same parameters, seed and code)
+params = {"width": WIDTH, "depth": DEPTH, "grid_res": GRID_RES, "num_stairs": NUM_STAIRS, "num_frames": NUM_FRAMES,
+          "steps_per_frame": STEPS_PER_FRAME, "wear_rate": WEAR_RATE, "feedback_sensitivity": FEEDBACK_SENSITIVITY}
+source_dir = os.path.dirname(os.path.abspath(__file__))
+version = code_version(*(os.path.join(source_dir, name) for name in
+                         ("full_staircase.py", "wear_engine.py", "wear_feedback.py", "stair_damage_evaluator.py")))
+# An interrupted run resumes from its last checkpoint
+checkpoint = Checkpointer(os.path.join(DEFAULT_CHECKPOINT_DIR, "full_staircase.pkl"),
+                          key=cache_key("full_staircase", params, SEED, "exact", version))
+result = SimCache().cached("full_staircase", lambda: simulate_frames(checkpoint), params, seed=SEED, scheme="exact",
+                          version=version, mmap=True)
 
-fig = go.Figure(data=initial_data, frames=frames)
-sliders = [dict(
-    steps=[dict(method='animate', args=[[f.name], dict(mode='immediate', frame=dict(duration=0, redraw=True))], label=f.name) for f in frames],
-    active=0, transition={'duration': 0}, x=0, len=1.0
-)]
+store = FrameStore(os.path.join(OUTPUT_DIR, "frames"), WIDTH, DEPTH, HEIGHT, overwrite=True)
+for wear, total_steps, current_total_vol in zip(result["wear"], result["steps"], result["volume"]):
+    store.append(wear, total_steps, current_total_vol)
 
-fig.update_layout(
-    title="Full Staircase Markov Drift Simulation",
-    scene=dict(aspectmode="data", camera=dict(eye=dict(x=2, y=-2, z=2))),
-    sliders=sliders
-)
+fig = plotly_animation(store, max_frames=MAX_INTERACTIVE_FRAMES, max_vis_wear=MAX_VIS_WEAR)
+fig.show()
 
-fig.show()
\ No newline at end of file
+if EXPORT_ANIMATION:
+    render_animation(store, os.path.join(OUTPUT_DIR, "staircase.gif"), max_vis_wear=MAX_VIS_WEAR)
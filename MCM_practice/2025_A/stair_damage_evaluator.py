@@ -1,3 +1,4 @@
+import warnings
 import numpy as np
 from scipy.integrate import dblquad
 from scipy.interpolate import RectBivariateSpline
@@ -14,6 +15,18 @@ def evaluate_stair_damage(X, Y, Z_worn, HEIGHT):
     
     return volume_difference
 
+def verify_volume_totals(engine, height, rtol=1e-3):
+    """
+    Check the WearEngine running volume totals against full-grid integration of every stair.
+    Returns the per-stair relative errors and warns if any exceeds rtol.
+    """
+    integrated = np.array([evaluate_stair_damage(engine.X, engine.Y, height - w, height) for w in engine.wear])
+    errors = np.abs(engine.volume - integrated) / np.maximum(np.abs(integrated), 1e-30)
+    if np.any(errors > rtol):
+        warnings.warn(f"Running volume totals deviate from integration: max rel. error {errors.max():.2e}",
+                      RuntimeWarning)
+    return errors
+
 
 # Example standalone usage with analytical surface
 if __name__ == "__main__":
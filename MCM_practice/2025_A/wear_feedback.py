@@ -0,0 +1,85 @@
+import numpy as np
+from wear_engine import FOOT_RX, FOOT_RY
+
+import repo_root  # puts the repo root on sys.path for the shared modules
+import instrument
+
+class WearFeedback:
+    """
+    Footstep placement that responds to the worn tread shape.
+    Each sampled centre is shifted by sensitivity * grad(wear): sensitivity > 0 draws pedestrians
+    into depressions (following the worn path), sensitivity < 0 makes them avoid them. Shifts are
+    capped at max_shift metres.
+
+    Wear gradients are cached per stair and only recomputed inside the region touched by the
+    latest deposits, so the per-frame cost scales with the footprint area, not the grid.
+    """
+    def __init__(self, engine, sensitivity=0.05, max_shift=0.03):
+        self.engine = engine
+        self.sensitivity = sensitivity
+        self.max_shift = max_shift
+        self.grad_x = np.zeros_like(engine.wear)
+        self.grad_y = np.zeros_like(engine.wear)
+        for stair in range(engine.num_stairs):
+            self.update(stair)
+
+    def region_for(self, cxs, cys):
+        """
+        Grid index box (y0, y1, x0, x1) whose gradients change when the given footprints are
+        deposited: the footprint boxes plus one cell for the central differences.
+        """
+        e = self.engine
+        n = e.grid_res
+        x0 = np.searchsorted(e.x, np.min(cxs) - FOOT_RX, side='left') - 1
+        x1 = np.searchsorted(e.x, np.max(cxs) + FOOT_RX, side='right') + 1
+        y0 = np.searchsorted(e.y, np.min(cys) - FOOT_RY, side='left') - 1
+        y1 = np.searchsorted(e.y, np.max(cys) + FOOT_RY, side='right') + 1
+        return max(y0, 0), min(y1, n), max(x0, 0), min(x1, n)
+
+    def update(self, stair, region=None):
+        """Recompute the cached gradient of one stair, optionally only inside region."""
+        e = self.engine
+        n = e.grid_res
+        y0, y1, x0, x1 = region if region is not None else (0, n, 0, n)
+        # One extra cell on each side so central differences match a full-grid np.gradient
+        ya, yb = max(y0 - 1, 0), min(y1 + 1, n)
+        xa, xb = max(x0 - 1, 0), min(x1 + 1, n)
+        if yb - ya < 2 or xb - xa < 2:
+            return
+        gy, gx = np.gradient(e.wear[stair, ya:yb, xa:xb], e.dy, e.dx)
+        self.grad_y[stair, y0:y1, x0:x1] = gy[y0 - ya:y1 - ya, x0 - xa:x1 - xa]
+        self.grad_x[stair, y0:y1, x0:x1] = gx[y0 - ya:y1 - ya, x0 - xa:x1 - xa]
+
+    def displace(self, stair, cxs, cys):
+        """Shift footstep centres along the cached wear gradient (nearest grid node)."""
+        e = self.engine
+        ix = np.clip(np.rint((cxs - e.x[0]) / e.dx).astype(np.int64), 0, e.grid_res - 1)
+        iy = np.clip(np.rint((cys - e.y[0]) / e.dy).astype(np.int64), 0, e.grid_res - 1)
+        shift_x = np.clip(self.sensitivity * self.grad_x[stair, iy, ix], -self.max_shift, self.max_shift)
+        shift_y = np.clip(self.sensitivity * self.grad_y[stair, iy, ix], -self.max_shift, self.max_shift)
+        return (np.clip(cxs + shift_x, e.x[0], e.x[-1]),
+                np.clip(cys + shift_y, e.y[0], e.y[-1]))
+
+    def step(self, stair, cxs, cys, method='exact'):
+        """Displace, deposit and refresh the gradient cache around the new footprints."""
+        cxs, cys = self.displace(stair, np.asarray(cxs, dtype=float), np.asarray(cys, dtype=float))
+        self.engine.deposit_batch(stair, cxs, cys, method=method)
+        self.update(stair, self.region_for(cxs, cys))
+        return cxs, cys
+
+    def density(self, base_density):
+        """
+        Callable for long_horizon.simulate_long_horizon: pushes the base placement density
+        forward through the current displacement field of each stair.
+        """
+        e = self.engine
+
+        def stair_density(engine, stair):
+            self.update(stair)
+            cxs, cys = self.displace(stair, e.X.ravel(), e.Y.ravel())
+            pushed = e.center_histogram(cxs, cys, weights=base_density.ravel())
+            return pushed / pushed.sum()
+
+        return stair_density
+
+instrument.register("wear", WearFeedback, "displace", "update", "step")
@@ -0,0 +1,129 @@
+import numpy as np
+from scipy import fft
+from scipy.optimize import nnls
+from long_horizon import DEPTH_SPAN
+
+def kernel_basis(engine, stride=2):
+    """
+    Wear field of one footstep centred on every stride-th grid node, as columns of a
+    (grid_res**2, n_centres) matrix. Returns (basis, centre_ix, centre_iy).
+    """
+    iy, ix = np.meshgrid(np.arange(0, engine.grid_res, stride), np.arange(0, engine.grid_res, stride),
+                         indexing='ij')
+    ix, iy = ix.ravel(), iy.ravel()
+    basis = np.empty((engine.grid_res**2, len(ix)))
+    for k, (i, j) in enumerate(zip(ix, iy)):
+        basis[:, k] = engine.footprint_field(engine.x[i:i+1], engine.y[j:j+1]).ravel()
+    return basis, ix, iy
+
+class _KernelConvolver:
+    """
+    'same'-mode convolution with the footprint kernel through a precomputed kernel FFT,
+    applied over the last two axes so a stack of stairs is convolved in one call.
+    """
+    def __init__(self, engine):
+        kernel = engine.grid_kernel()
+        self.ky, self.kx = kernel.shape
+        self.n = engine.grid_res
+        self.shape = (fft.next_fast_len(self.n + self.ky - 1), fft.next_fast_len(self.n + self.kx - 1))
+        self.kernel_hat = fft.rfft2(kernel, self.shape)
+
+    def __call__(self, field):
+        full = fft.irfft2(fft.rfft2(field, self.shape) * self.kernel_hat, self.shape)
+        oy, ox = self.ky // 2, self.kx // 2
+        return full[..., oy:oy + self.n, ox:ox + self.n]
+
+def deconvolve_centres(engine, wear, iterations=100):
+    """
+    Non-negative footstep-centre counts per grid node whose kernel convolution matches wear
+    (one map or a stack of maps), by Richardson-Lucy iterations (the footprint kernel is
+    symmetric, so it is its own adjoint). wear must already be divided by the wear rate.
+    """
+    conv = _KernelConvolver(engine)
+    wear = np.maximum(wear, 0.0)
+    norm = np.maximum(conv(np.ones(wear.shape[-2:])), 1e-12)
+    initial = wear.sum(axis=(-2, -1), keepdims=True) / engine.grid_kernel().sum() / engine.grid_res**2
+    counts = np.broadcast_to(initial, wear.shape).copy()
+    for _ in range(iterations):
+        predicted = np.maximum(conv(counts), 1e-12)
+        counts *= conv(wear / predicted) / norm
+    return counts
+
+def fit_centres_nnls(engine, wear, basis=None, stride=2):
+    """Footstep-centre counts on a coarse lattice by non-negative least squares against kernel bases."""
+    if basis is None:
+        basis = kernel_basis(engine, stride)
+    matrix, ix, iy = basis
+    weights, _ = nnls(matrix, wear.ravel())
+    counts = np.zeros((engine.grid_res, engine.grid_res))
+    counts[iy, ix] = weights
+    return counts
+
+def _beta_moments(positions, weights):
+    """Method-of-moments Beta(a, b) fit for weighted positions in [0, 1]."""
+    total = weights.sum()
+    if total <= 0:
+        return np.nan, np.nan
+    mean = np.sum(positions * weights) / total
+    var = np.sum((positions - mean)**2 * weights) / total
+    common = mean * (1 - mean) / max(var, 1e-12) - 1
+    return mean * common, (1 - mean) * common
+
+def estimate_traffic(engine, wear_maps, wear_rate, method='auto', stride=2, iterations=100):
+    """
+    Infer traffic from measured wear height maps (num_stairs x grid_res x grid_res).
+
+    Returns a dict with the fitted centre counts per stair, the footstep count per stair,
+    the traffic intensity (median per-stair count, i.e. pedestrians for stairs with drift 1),
+    the per-stair drift_profiles relative to it, and Beta fits of the lateral and depth
+    placement (same parametrisation as the forward model).
+    method='nnls' solves against precomputed kernel bases (small grids); 'fft' uses
+    Richardson-Lucy deconvolution with a precomputed kernel FFT (fine scanned grids).
+    """
+    wear_maps = np.asarray(wear_maps, dtype=float) / wear_rate
+    if method == 'auto':
+        method = 'nnls' if engine.grid_res <= 64 else 'fft'
+
+    if method == 'nnls':
+        basis = kernel_basis(engine, stride)
+        counts = np.array([fit_centres_nnls(engine, w, basis) for w in wear_maps])
+    elif method == 'fft':
+        counts = deconvolve_centres(engine, wear_maps, iterations)
+    else:
+        raise ValueError(f"Unknown inversion method: {method}")
+
+    steps_per_stair = counts.sum(axis=(1, 2))
+    intensity = float(np.median(steps_per_stair))
+    total = counts.sum(axis=0)
+    lateral = _beta_moments(engine.x / engine.width + 0.5, total.sum(axis=0))
+    in_span = engine.y <= DEPTH_SPAN
+    depth = _beta_moments(engine.y[in_span] / DEPTH_SPAN, total.sum(axis=1)[in_span])
+
+    return {
+        'centre_counts': counts,
+        'steps_per_stair': steps_per_stair,
+        'traffic_intensity': intensity,
+        'drift_profiles': steps_per_stair / intensity if intensity > 0 else steps_per_stair,
+        'lateral_beta': lateral,
+        'depth_beta': depth,
+        'method': method,
+    }
+
+if __name__ == "__main__":
+    import time
+    from wear_engine import WearEngine
+
+    rng = np.random.default_rng(0)
+    drift = [1.5, 1.0, 1.0, 1.0, 1.5]
+    for grid_res in (50, 200):
+        engine = WearEngine(5, grid_res, 0.30, 0.30, 0.000055, drift)
+        for stair in range(5):
+            # drift_profiles are applied by the engine's per-stair wear scale
+            engine.deposit_batch(stair, (rng.beta(3, 3, 20000) - 0.5) * 0.30, rng.beta(2, 5, 20000) * 0.25,
+                                 method='fft')
+        start = time.time()
+        fit = estimate_traffic(engine, engine.wear, 0.000055)
+        print(f"{grid_res}x{grid_res} ({fit['method']}, {time.time() - start:.2f} s): "
+              f"intensity {fit['traffic_intensity']:.0f}, "
+              f"drift {np.round(fit['drift_profiles'], 2)}, "
+              f"lateral Beta{np.round(fit['lateral_beta'], 2)}, depth Beta{np.round(fit['depth_beta'], 2)}")
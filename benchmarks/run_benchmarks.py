@@ -0,0 +1,292 @@
+"""
+Benchmarks for the simulation hot paths of all projects in the repo.
+Every benchmark is run at several problem sizes; for each it records the best wall time over a
+few repeats, the throughput (work units per second) and the peak traced memory of one extra run.
+Results are appended to a JSON history keyed by git commit, and throughput drops or memory growth
+beyond a threshold relative to the latest run of another commit are flagged as regressions.
+
+    python benchmarks/run_benchmarks.py [--quick] [--only NAME ...] [--backend numba] [--threshold 0.2]
+                                        [--fail-on-regression]
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PROJECT_DIRS = {
+    "battery": os.path.join(REPO_ROOT, "MCM_2026", "stochastic"),
+    "cycling": os.path.join(REPO_ROOT, "MCM_practice", "2022_A"),
+    "plants": os.path.join(REPO_ROOT, "MCM_practice", "2023_A"),
+    "stairs": os.path.join(REPO_ROOT, "MCM_practice", "2025_A"),
+}
+sys.path.insert(0, REPO_ROOT)
+import kernel_backend
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.json")
+REGRESSION_THRESHOLD = 0.2  # relative throughput drop / peak memory growth that counts as a regression
+
+# name -> (setup, sizes, quick_sizes, unit); setup(size) returns (run, work units per run)
+BENCHMARKS = {}
+
+def benchmark(name, sizes, quick_sizes, unit):
+    def register(setup):
+        BENCHMARKS[name] = (setup, sizes, quick_sizes, unit)
+        return setup
+    return register
+
+def project_module(project, module):
+    """Import a module of one project (the project folders are flat script directories)."""
+    if PROJECT_DIRS[project] not in sys.path:
+        sys.path.insert(0, PROJECT_DIRS[project])
+    return importlib.import_module(module)
+
+@benchmark("rk4_step_soc", sizes=(1, 1000, 100000), quick_sizes=(1, 1000), unit="path-steps")
+def bench_rk4_step_soc(n_paths, n_steps=200):
+    sf = project_module("battery", "stochastic_full")
+    dt = sf.T / sf.N
+    dW = np.random.default_rng(0).normal(0, np.sqrt(dt), (n_steps, n_paths))
+    if n_paths == 1:
+        dW = dW[:, 0].tolist()
+
+    def run():
+        soc = 100.0 if n_paths == 1 else np.full(n_paths, 100.0)
+        for step in range(n_steps):
+            soc, _ = sf.rk4_step_soc(soc, step * dt, dt, dW[step])
+    return run, n_paths * n_steps
+
+@benchmark("run_monte_carlo", sizes=((10, 5000), (20, 10000)), quick_sizes=((4, 2000),), unit="path-steps")
+def bench_run_monte_carlo(size):
+    n_paths, n_steps = size
+    mc = project_module("battery", "monteCarloSim")
+
+    def run():
+        # run_sim reads the step count and time grid from module globals
+        saved = mc.N, mc.dt, mc.timeInHours
+        mc.N, mc.dt, mc.timeInHours = n_steps, mc.T / n_steps, np.linspace(0, mc.T, n_steps)
+        try:
+            np.random.seed(0)
+            mc.run_monte_carlo(n_paths, 100, 1.0, {})
+        finally:
+            mc.N, mc.dt, mc.timeInHours = saved
+    return run, n_paths * n_steps
+
+@benchmark("solve_velocity", sizes=(1000, 10000), quick_sizes=(1000,), unit="solves")
+def bench_solve_velocity(n_points):
+    pc = project_module("cycling", "power_calculator")
+    rng = np.random.default_rng(0)
+    powers = rng.uniform(150, 600, n_points).tolist()
+    slopes = rng.uniform(-0.1, 0.1, n_points).tolist()
+
+    def run():
+        for power, slope in zip(powers, slopes):
+            pc.solve_velocity(power, slope)
+    return run, n_points
+
+@benchmark("solve_velocity_array", sizes=(10000, 1000000), quick_sizes=(10000,), unit="solves")
+def bench_solve_velocity_array(n_points):
+    pc = project_module("cycling", "power_calculator")
+    rng = np.random.default_rng(0)
+    powers = rng.uniform(150, 600, n_points)
+    slopes = rng.uniform(-0.1, 0.1, n_points)
+    return lambda: pc.solve_velocity_array(powers, slopes), n_points
+
+@benchmark("generate_track", sizes=(1000, 10000), quick_sizes=(1000,), unit="points")
+def bench_generate_track(n_points):
+    track = project_module("cycling", "track")
+
+    def run():
+        random.seed(0)
+        track.generate_track(n_points=n_points, total_length=10.0 * n_points)
+    return run, n_points
+
+@benchmark("pace_segments", sizes=(1000, 100000), quick_sizes=(1000,), unit="segments")
+def bench_pace_segments(n_points):
+    pc = project_module("cycling", "power_calculator")
+    track = project_module("cycling", "track")
+    rng = np.random.default_rng(0)
+    arrays = {name: np.zeros(n_points) for name in track.TRACK_FIELDS}
+    arrays["segment_length"] = np.full(n_points, 5.0)
+    arrays["slope"] = rng.normal(0, 0.05, n_points)
+    course = track.Track.from_arrays(arrays)
+    inputs = pc.pacing_inputs(395.3, 600, course)
+    return lambda: pc.pace_segments(*inputs, 395.3, 31.8, 22.0), n_points
+
+@benchmark("stair_footsteps", sizes=(50, 100, 200), quick_sizes=(50,), unit="footsteps")
+def bench_stair_footsteps(grid_res, num_stairs=5, num_frames=10, steps_per_frame=50, sensitivity=0.0):
+    """
+    The full_staircase frame loop: beta/normal placement and exact deposits, straight into the
+    engine as in the default run (FEEDBACK_SENSITIVITY = 0) or through WearFeedback otherwise.
+    """
+    wear_engine = project_module("stairs", "wear_engine")
+    wear_feedback = project_module("stairs", "wear_feedback")
+    width, depth = 0.30, 0.30
+
+    def run():
+        rng = np.random.default_rng(0)
+        engine = wear_engine.WearEngine(num_stairs, grid_res, width, depth, 0.000055)
+        feedback = wear_feedback.WearFeedback(engine, sensitivity) if sensitivity else None
+        for _ in range(num_frames):
+            current_x = (rng.beta(3, 3, steps_per_frame) - 0.5) * width
+            for stair in range(num_stairs):
+                current_x = np.clip(current_x + rng.normal(0, 0.02, steps_per_frame), -width/2, width/2)
+                current_y = rng.beta(2, 5, steps_per_frame) * 0.25
+                if feedback is not None:
+                    current_x, current_y = feedback.step(stair, current_x, current_y)
+                else:
+                    engine.deposit_batch(stair, current_x, current_y)
+    return run, num_stairs * num_frames * steps_per_frame
+
+@benchmark("stair_footsteps_feedback", sizes=(50, 100, 200), quick_sizes=(50,), unit="footsteps")
+def bench_stair_footsteps_feedback(grid_res):
+    """The same loop with wear feedback on (sensitivity 0.05): gradient lookups and shifted deposits."""
+    return bench_stair_footsteps(grid_res, sensitivity=0.05)
+
+@benchmark("update_population", sizes=(10, 100), quick_sizes=(10,), unit="pfg-cycles")
+def bench_update_population(num_pfgs, num_cycles=200):
+    """The per-object PlantFunctionalGroup cycle (the original simulation loop)."""
+    sim = project_module("plants", "pfg_simulation")
+
+    def run():
+        random.seed(0)
+        pfgs = sim.generate_random_pfgs(num_pfgs)
+        for weather in sim.simulate_weather_cycles(num_cycles):
+            total_water = sum(p.calculate_water_demand() for p in pfgs)
+            total_space = sum(p.calculate_space_demand() for p in pfgs)
+            for pfg in pfgs:
+                pfg.update_population(weather, total_water, total_space, 10000, 5000)
+    return run, num_pfgs * num_cycles
+
+@benchmark("pfg_community", sizes=(100, 10000), quick_sizes=(100,), unit="pfg-cycles")
+def bench_pfg_community(num_pfgs, num_cycles=1000):
+    community = project_module("plants", "pfg_community")
+
+    def run():
+        rng = np.random.default_rng(0)
+        pfgs = community.PFGCommunity.random(num_pfgs, rng)
+        pfgs.run(community.simulate_weather_codes(num_cycles, rng), rng)
+    return run, num_pfgs * num_cycles
+
+def measure(run, work, repeats=3):
+    """Best-of-repeats wall time, throughput and peak traced memory of one more run."""
+    run()  # warm-up: imports, caches and first-call allocations
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": best, "throughput": work / best, "peak_bytes": peak}
+
+def run_benchmarks(names=None, quick=False, repeats=3, log=print):
+    results = {}
+    for name, (setup, sizes, quick_sizes, unit) in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        for size in quick_sizes if quick else sizes:
+            label = f"{name}[{'x'.join(map(str, np.atleast_1d(size)))}]"
+            run, work = setup(size)
+            result = measure(run, work, repeats)
+            result["unit"] = unit
+            results[label] = result
+            log(f"{label:32s} {result['seconds']*1e3:10.2f} ms {result['throughput']:14.4g} {unit}/s "
+                f"{result['peak_bytes'] / 2**20:9.2f} MiB")
+    return results
+
+def git_commit():
+    """(commit hash, working tree has uncommitted changes), or (None, None) outside a git checkout."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+def save_history(history, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp_path, path)
+
+def find_regressions(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """(label, metric, baseline value, new value) for every throughput drop or memory growth beyond threshold."""
+    regressions = []
+    for label, result in results.items():
+        old = baseline["results"].get(label)
+        if old is None:
+            continue
+        if result["throughput"] < old["throughput"] * (1 - threshold):
+            regressions.append((label, "throughput", old["throughput"], result["throughput"]))
+        if result["peak_bytes"] > old["peak_bytes"] * (1 + threshold) + 2**16:
+            regressions.append((label, "peak_bytes", old["peak_bytes"], result["peak_bytes"]))
+    return regressions
+
+def baseline_record(history, commit, machine, backend="numpy"):
+    """
+    Latest record from another commit on the same machine and kernel backend (runs on different
+    hosts or backends are not comparable).
+    """
+    for record in reversed(history):
+        if (record["machine"] == machine and record.get("backend", "numpy") == backend
+                and record["commit"] != commit):
+            return record
+    return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="only the small problem sizes")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--backend", choices=kernel_backend.BACKENDS, default="numpy", help="kernel backend")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--history", default=DEFAULT_HISTORY)
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--no-save", action="store_true", help="do not append this run to the history")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    commit, dirty = git_commit()
+    machine = platform.node()
+    kernel_backend.set_backend(args.backend)
+    print(f"commit {commit}{' (dirty)' if dirty else ''} on {machine}, Python {platform.python_version()}, "
+          f"NumPy {np.__version__}, {kernel_backend.get_backend()} kernels")
+    results = run_benchmarks(args.only, args.quick, args.repeats)
+
+    history = load_history(args.history)
+    baseline = baseline_record(history, commit, machine, kernel_backend.get_backend())
+    regressions = find_regressions(results, baseline, args.threshold) if baseline else []
+    if baseline is None:
+        print("No earlier commit in the history to compare against")
+    else:
+        print(f"Compared with {baseline['commit'][:10]} ({baseline['timestamp']}): "
+              f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+    for label, metric, old, new in regressions:
+        print(f"  REGRESSION {label} {metric}: {old:.4g} -> {new:.4g}")
+
+    if not args.no_save:
+        history.append({"commit": commit, "dirty": dirty, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "machine": machine, "python": platform.python_version(), "numpy": np.__version__,
+                        "backend": kernel_backend.get_backend(), "quick": args.quick, "results": results})
+        save_history(history, args.history)
+    if args.fail_on_regression and regressions:
+        sys.exit(1)
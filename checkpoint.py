@@ -0,0 +1,64 @@
+"""
+Periodic checkpoint/resume for long simulation loops, shared by all projects in the repo.
+A loop hands its full state (simulator objects, RNG state, partial aggregates) to
+Checkpointer.maybe_save at iteration boundaries and restores it with load() on restart, so an
+interrupted run continues bit-identically. Project modules import it after the repo_root
+module of their project folder.
+"""
+import os
+import pickle
+import time
+
+import instrument
+
+DEFAULT_CHECKPOINT_DIR = os.environ.get(
+    "SIM_CHECKPOINT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sim_checkpoints"))
+
+class Checkpointer:
+    """
+    Pickle-based checkpoint file for one loop. Saves are atomic (temporary file, fsync, rename),
+    so a run killed mid-save still resumes from the previous checkpoint. maybe_save only builds
+    and writes the state once `interval` seconds have passed since the last save.
+    `key` identifies the run (e.g. a sim_cache.cache_key of its parameters); a checkpoint written
+    under a different key is ignored rather than resumed.
+    """
+    def __init__(self, path, interval=60.0, key=None):
+        self.path = path
+        self.interval = interval
+        self.key = key
+        self._last_save = time.monotonic()
+
+    def load(self):
+        """The last saved state, or None when there is nothing to resume."""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as f:
+            saved = pickle.load(f)
+        if saved["key"] != self.key:
+            return None
+        return saved["state"]
+
+    def save(self, state):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"key": self.key, "state": state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._last_save = time.monotonic()
+        instrument.count("checkpoint.saves")
+        instrument.count("checkpoint.bytes", os.path.getsize(self.path))
+
+    def maybe_save(self, make_state):
+        """Save make_state() if the interval has elapsed; returns whether a checkpoint was written."""
+        if time.monotonic() - self._last_save < self.interval:
+            return False
+        self.save(make_state())
+        return True
+
+    def done(self):
+        """Remove the checkpoint once the loop has finished."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,206 @@
+"""
+Opt-in instrumentation for the simulators, shared by all projects in the repo.
+Modules register their hot functions as probes (grouped by simulator); enable() swaps the
+registered functions for timed wrappers and disable() puts the originals back, so a disabled run
+executes the original code with no wrappers at all. Loops add coarser stage() blocks with a work
+count (steps, footsteps, PFG-cycles) for steps-per-second gauges; when disabled these are a
+shared no-op context manager. Collected timings, call counts, net allocations (memory=True,
+via tracemalloc) and counters are exported with report(), print_report() or write_chrome_trace()
+(chrome://tracing or Perfetto). Setting SIM_INSTRUMENT=1 enables all groups at import and prints
+the report when the process exits (SIM_INSTRUMENT_TRACE=<path> also writes a Chrome trace).
+Project modules import it after the repo_root module of their project folder, which puts the
+repo root on sys.path.
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+MAX_TRACE_EVENTS = 1_000_000
+
+_probes = {}  # group -> [(owner, attribute, stage name)]
+_installed = {}  # (owner, attribute) -> original function
+_stats = {}  # stage name -> [calls, seconds, max seconds, work, net allocated bytes]
+_counters = {}
+_events = []
+_state = {"enabled": False, "groups": None, "memory": False, "trace": True, "origin": 0.0, "dropped": 0}
+
+def _record(name, start, end, work, allocated):
+    stats = _stats.get(name)
+    if stats is None:
+        stats = _stats[name] = [0, 0.0, 0.0, 0, 0]
+    elapsed = end - start
+    stats[0] += 1
+    stats[1] += elapsed
+    stats[2] = max(stats[2], elapsed)
+    stats[3] += work
+    stats[4] += allocated
+    if _state["trace"]:
+        if len(_events) < MAX_TRACE_EVENTS:
+            _events.append((name, start, elapsed, threading.get_ident()))
+        else:
+            _state["dropped"] += 1
+
+class _Stage:
+    __slots__ = ("name", "work", "start", "memory")
+
+    def __init__(self, name, work):
+        self.name = name
+        self.work = work
+
+    def __enter__(self):
+        self.memory = tracemalloc.get_traced_memory()[0] if _state["memory"] else 0
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        allocated = tracemalloc.get_traced_memory()[0] - self.memory if _state["memory"] else 0
+        _record(self.name, self.start, end, self.work, allocated)
+        return False
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+def stage(name, work=0):
+    """Timed block; `work` units (e.g. steps) feed the stage's per-second gauge."""
+    if not _state["enabled"]:
+        return _NULL_STAGE
+    return _Stage(name, work)
+
+def count(name, n=1):
+    if _state["enabled"]:
+        _counters[name] = _counters.get(name, 0) + n
+
+def _wrap(name, func):
+    @functools.wraps(func)
+    def probe(*args, **kwargs):
+        with _Stage(name, 0):
+            return func(*args, **kwargs)
+    return probe
+
+def _install(owner, attribute, name):
+    if (owner, attribute) in _installed:
+        return
+    original = vars(owner)[attribute]
+    _installed[(owner, attribute)] = original
+    setattr(owner, attribute, _wrap(name, original))
+
+def register(group, owner, *attributes):
+    """
+    Declare functions of a module (or methods of a class) as probes of a simulator group.
+    Stage names are "<group>.<attribute>"; probes are installed right away if the group is enabled.
+    """
+    entries = _probes.setdefault(group, [])
+    for attribute in attributes:
+        entry = (owner, attribute, f"{group}.{attribute}")
+        entries.append(entry)
+        if _state["enabled"] and (_state["groups"] is None or group in _state["groups"]):
+            _install(*entry)
+
+def enable(groups=None, memory=False, trace=True):
+    """
+    Start collecting for the given probe groups (all by default); memory=True also tracks net
+    allocations per stage. Nested probes add their trace events to the enclosing stage's
+    allocations, so use trace=False when the allocation figures matter.
+    """
+    disable()
+    _state.update(enabled=True, groups=None if groups is None else set(groups), memory=memory, trace=trace)
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    for group, entries in _probes.items():
+        if groups is None or group in groups:
+            for entry in entries:
+                _install(*entry)
+
+def disable():
+    """Stop collecting and restore the original functions (collected data is kept until reset())."""
+    for (owner, attribute), original in _installed.items():
+        setattr(owner, attribute, original)
+    _installed.clear()
+    if _state["memory"] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _state.update(enabled=False, memory=False)
+
+def reset():
+    _stats.clear()
+    _counters.clear()
+    _events.clear()
+    _state.update(origin=time.perf_counter(), dropped=0)
+
+class profiling:
+    """`with instrument.profiling(...):` enables (fresh data) for the block and disables afterwards."""
+    def __init__(self, groups=None, memory=False, trace=True):
+        self.options = (groups, memory, trace)
+
+    def __enter__(self):
+        reset()
+        enable(*self.options)
+        return self
+
+    def __exit__(self, *exc):
+        disable()
+        return False
+
+def report():
+    """Per-stage calls, total/mean/max time, work rate and net allocations, plus the counters."""
+    stages = {}
+    for name, (calls, seconds, max_seconds, work, allocated) in sorted(_stats.items(), key=lambda kv: -kv[1][1]):
+        stages[name] = {"calls": calls, "seconds": seconds, "mean_us": seconds / calls * 1e6,
+                        "max_us": max_seconds * 1e6, "work": work,
+                        "rate": work / seconds if work and seconds > 0 else None,
+                        "allocated_bytes": allocated}
+    result = {"stages": stages, "counters": dict(_counters), "dropped_trace_events": _state["dropped"]}
+    if tracemalloc.is_tracing():
+        result["peak_traced_bytes"] = tracemalloc.get_traced_memory()[1]
+    return result
+
+def print_report(log=print):
+    data = report()
+    log(f"{'stage':36s} {'calls':>9s} {'total s':>9s} {'mean us':>10s} {'max us':>10s} {'rate /s':>11s} {'alloc MiB':>10s}")
+    for name, s in data["stages"].items():
+        rate = f"{s['rate']:11.4g}" if s["rate"] is not None else f"{'':11s}"
+        log(f"{name:36s} {s['calls']:9d} {s['seconds']:9.3f} {s['mean_us']:10.2f} {s['max_us']:10.1f} {rate} "
+            f"{s['allocated_bytes'] / 2**20:10.2f}")
+    for name, value in data["counters"].items():
+        log(f"{name:36s} {value:9d}")
+    if "peak_traced_bytes" in data:
+        log(f"peak traced memory {data['peak_traced_bytes'] / 2**20:.2f} MiB")
+
+def write_report(path):
+    with open(path, "w") as f:
+        json.dump(report(), f, indent=1)
+
+def write_chrome_trace(path):
+    """Trace Event Format JSON: one complete event per timed call and final counter values."""
+    pid = os.getpid()
+    origin = _state["origin"]
+    events = [{"name": name, "cat": name.split(".", 1)[0], "ph": "X", "pid": pid, "tid": tid,
+               "ts": (start - origin) * 1e6, "dur": elapsed * 1e6}
+              for name, start, elapsed, tid in _events]
+    end = max((e["ts"] + e["dur"] for e in events), default=0.0)
+    events += [{"name": name, "ph": "C", "pid": pid, "ts": end, "args": {"value": value}}
+               for name, value in _counters.items()]
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+def _report_at_exit():
+    print_report()
+    if os.environ.get("SIM_INSTRUMENT_TRACE"):
+        write_chrome_trace(os.environ["SIM_INSTRUMENT_TRACE"])
+
+reset()
+if os.environ.get("SIM_INSTRUMENT", "") not in ("", "0"):
+    enable()
+    atexit.register(_report_at_exit)
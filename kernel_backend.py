@@ -0,0 +1,131 @@
+"""
+Optional Numba backend for the sequential step loops of the simulators, shared by all projects.
+Loops that cannot be vectorized across time keep their NumPy/Python implementation and add a
+compiled kernel next to it; the caller picks the kernel while the "numba" backend is active.
+Kernels take their random numbers pre-drawn from the caller's generator, so both backends
+consume the same stream and give identical results under a fixed seed.
+
+The backend is chosen with set_backend()/use_backend() or the SIM_KERNEL_BACKEND environment
+variable. Requesting "numba" without Numba installed warns once and stays on "numpy".
+Project modules import it after the repo_root module of their project folder, which puts the
+repo root on sys.path.
+"""
+import os
+import warnings
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKENDS = ("numpy", "numba")
+_state = {"backend": "numpy"}
+
+def available_backends():
+    return BACKENDS if numba is not None else ("numpy",)
+
+def set_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown kernel backend {name!r}; expected one of {BACKENDS}")
+    if name == "numba" and numba is None:
+        warnings.warn("Numba is not installed; kernels fall back to the NumPy implementation")
+        name = "numpy"
+    _state["backend"] = name
+
+def get_backend():
+    return _state["backend"]
+
+def active():
+    """True when compiled kernels should be used."""
+    return _state["backend"] == "numba"
+
+class use_backend:
+    """`with kernel_backend.use_backend("numba"):` selects a backend for a block."""
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.previous = get_backend()
+        set_backend(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        _state["backend"] = self.previous
+        return False
+
+def jit(func):
+    """
+    Kernel decorator: numba.njit(func) (compiled on first call, cached on disk, callable from other
+    kernels), or func itself when Numba is not installed. Call sites run kernels only while active().
+    """
+    if numba is None:
+        return func
+    return numba.njit(cache=True)(func)
+
+@jit
+def _block_sum(a, lo, n):
+    """NumPy's pairwise-sum leaf: sequential below 8 items, else 8 interleaved accumulators."""
+    if n < 8:
+        res = 0.0
+        for i in range(lo, lo + n):
+            res += a[i]
+        return res
+    r0, r1, r2, r3 = a[lo], a[lo + 1], a[lo + 2], a[lo + 3]
+    r4, r5, r6, r7 = a[lo + 4], a[lo + 5], a[lo + 6], a[lo + 7]
+    i = 8
+    while i < n - n % 8:
+        r0 += a[lo + i]
+        r1 += a[lo + i + 1]
+        r2 += a[lo + i + 2]
+        r3 += a[lo + i + 3]
+        r4 += a[lo + i + 4]
+        r5 += a[lo + i + 5]
+        r6 += a[lo + i + 6]
+        r7 += a[lo + i + 7]
+        i += 8
+    res = ((r0 + r1) + (r2 + r3)) + ((r4 + r5) + (r6 + r7))
+    while i < n:
+        res += a[lo + i]
+        i += 1
+    return res
+
+@jit
+def pairwise_sum(a):
+    """
+    np.sum of a 1-D float array inside a kernel, with NumPy's pairwise summation order (same
+    rounding). NumPy halves blocks above 128 items recursively; the halving tree is walked with
+    an explicit stack because Numba cannot reload cached recursive functions.
+    """
+    lo_stack = np.empty(64, dtype=np.int64)
+    n_stack = np.empty(64, dtype=np.int64)
+    visits = np.zeros(64, dtype=np.int64)
+    partial = np.empty(64)
+    lo_stack[0], n_stack[0], visits[0] = 0, len(a), 0
+    top, n_partial = 1, 0
+    while top > 0:
+        lo, n = lo_stack[top - 1], n_stack[top - 1]
+        if n <= 128:
+            partial[n_partial] = _block_sum(a, lo, n)
+            n_partial += 1
+            top -= 1
+            continue
+        n2 = n // 2
+        n2 -= n2 % 8
+        if visits[top - 1] == 0:
+            visits[top - 1] = 1
+            lo_stack[top], n_stack[top], visits[top] = lo, n2, 0
+            top += 1
+        elif visits[top - 1] == 1:
+            visits[top - 1] = 2
+            lo_stack[top], n_stack[top], visits[top] = lo + n2, n - n2, 0
+            top += 1
+        else:
+            n_partial -= 1
+            partial[n_partial - 1] = partial[n_partial - 1] + partial[n_partial]
+            top -= 1
+    return partial[0]
+
+if os.environ.get("SIM_KERNEL_BACKEND"):
+    set_backend(os.environ["SIM_KERNEL_BACKEND"])
@@ -0,0 +1,139 @@
+"""
+Content-addressed on-disk cache for simulation outputs, shared by all projects in the repo.
+Entries are keyed on the model parameters, seed, scheme and code version and hold a dict of
+arrays (compressed .npz, or memory-mapped .npy files), evicted least-recently-used.
+Project modules import it after the repo_root module of their project folder.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "SIM_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sim_cache"))
+DEFAULT_MAX_BYTES = int(float(os.environ.get("SIM_CACHE_MAX_BYTES", 2 * 1024**3)))
+
+def code_version(*paths):
+    """Hash of the given source files (e.g. __file__ of the modules a result depends on)."""
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def _canonical(value):
+    """JSON-serialisable form of a parameter; arrays are represented by a hash of their contents."""
+    if isinstance(value, np.ndarray):
+        return {"array": hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest(),
+                "dtype": str(value.dtype), "shape": list(value.shape)}
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def cache_key(name, params=None, seed=None, scheme=None, version=None):
+    payload = json.dumps({"name": name, "params": _canonical(params or {}), "seed": _canonical(seed),
+                          "scheme": scheme, "version": version}, sort_keys=True)
+    return f"{name}_{hashlib.sha1(payload.encode()).hexdigest()[:20]}"
+
+class SimCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, enabled=True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _npz_path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def _mmap_path(self, key):
+        return os.path.join(self.cache_dir, key + ".npyd")
+
+    def get(self, key):
+        """Cached arrays for key (memory-mapped for mmap entries), or None on a miss."""
+        npz_path, mmap_path = self._npz_path(key), self._mmap_path(key)
+        if os.path.exists(npz_path):
+            os.utime(npz_path)  # mtime doubles as last-access time for LRU eviction
+            with np.load(npz_path) as data:
+                return {name: data[name] for name in data.files}
+        if os.path.isdir(mmap_path):
+            os.utime(mmap_path)
+            return {name[:-4]: np.load(os.path.join(mmap_path, name), mmap_mode="r")
+                    for name in os.listdir(mmap_path) if name.endswith(".npy")}
+        return None
+
+    def put(self, key, arrays, mmap=False):
+        """Store a dict of arrays atomically, then evict down to the size budget."""
+        arrays = {name: np.asarray(value) for name, value in arrays.items()}
+        if mmap:
+            path = self._mmap_path(key)
+            tmp_path = path + ".tmp"
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            os.makedirs(tmp_path)
+            for name, value in arrays.items():
+                np.save(os.path.join(tmp_path, name + ".npy"), value)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+        else:
+            path = self._npz_path(key)
+            tmp_path = path + ".tmp.npz"
+            np.savez_compressed(tmp_path, **arrays)
+            os.replace(tmp_path, path)
+        self.evict(keep=key)
+
+    def cached(self, name, compute, params=None, seed=None, scheme=None, version=None, mmap=False):
+        """
+        Return compute()'s dict of arrays for these inputs, from the cache when present.
+        Cached and fresh results are both returned as dicts of arrays.
+        """
+        if not self.enabled:
+            return compute()
+        key = cache_key(name, params, seed, scheme, version)
+        result = self.get(key)
+        if result is None:
+            self.put(key, compute(), mmap)
+            result = self.get(key)
+        return result
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".tmp") or name.endswith(".tmp.npz"):
+                continue
+            if os.path.isdir(path):
+                size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            else:
+                size = os.path.getsize(path)
+            entries.append((os.path.getmtime(path), size, path))
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, keep=None):
+        """Drop least-recently-used entries until the cache fits in max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if keep is not None and os.path.basename(path).rsplit(".", 1)[0] == keep:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self._entries():
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
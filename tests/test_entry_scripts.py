@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def run_script(relative_path, tmp_path, **env):
+    """Run a project entry script from its own folder, as `python <script>`, with caches in tmp_path."""
+    script = os.path.join(REPO_ROOT, relative_path)
+    environment = {**os.environ, "MPLBACKEND": "Agg", "SIM_CACHE_DIR": str(tmp_path / "cache"),
+                   "SIM_CHECKPOINT_DIR": str(tmp_path / "checkpoints"), **env}
+    environment.pop("PYTHONPATH", None)
+    return subprocess.run([sys.executable, os.path.basename(script)], cwd=os.path.dirname(script),
+                          env=environment, capture_output=True, text=True, timeout=600, check=True)
+
+
+def test_instrumented_entry_script_reports_its_stages(tmp_path):
+    result = run_script(os.path.join("MCM_practice", "2023_A", "pfg_simulation.py"), tmp_path, SIM_INSTRUMENT="1")
+    report = result.stdout[result.stdout.rindex("stage "):].splitlines()[1:]
+    stages = {line.split()[0] for line in report}
+    assert {"pfg.cycle", "pfg.step", "pfg.generate_random_pfgs", "pfg.history_bytes"} <= stages
+
+
+@pytest.mark.parametrize("relative_path, kernel_module", [
+    (os.path.join("MCM_practice", "2023_A", "pfg_ensemble.py"), "pfg_community"),
+    (os.path.join("MCM_practice", "2023_A", "pfg_simulation.py"), "pfg_community"),
+    (os.path.join("MCM_2026", "stochastic", "stochastic_full.py"), "stochastic_full"),
+])
+def test_entry_script_honours_kernel_backend(relative_path, kernel_module, tmp_path):
+    pytest.importorskip("numba")
+    # Imports the entry script from its own folder, as running it does, and asks the simulator
+    # module that holds the compiled kernels which backend it sees
+    check = (f"import {os.path.splitext(os.path.basename(relative_path))[0]}, {kernel_module}; "
+             f"print({kernel_module}.kernel_backend.get_backend(), {kernel_module}.kernel_backend.active())")
+    folder = os.path.join(REPO_ROOT, os.path.dirname(relative_path))
+    environment = {**os.environ, "MPLBACKEND": "Agg", "SIM_KERNEL_BACKEND": "numba"}
+    environment.pop("PYTHONPATH", None)
+    result = subprocess.run([sys.executable, "-c", check], cwd=folder, env=environment,
+                            capture_output=True, text=True, timeout=600, check=True)
+    assert result.stdout.split() == ["numba", "True"]
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "MCM_practice", "2022_A"))
+
+import pacing_ensemble as pe  # noqa: E402
+import power_calculator as pc  # noqa: E402
+
+
+def largest_root(power, slope, headwind):
+    """Reference: largest sign change of the power balance on a fine grid, refined by bisection."""
+    alpha = np.arctan(slope)
+    k = 0.5 * pc.RHO * pc.CDA
+    c = pc.MASS_SYS * pc.G * (np.sin(alpha) + pc.CRR * np.cos(alpha))
+    f = lambda v: k * v * (v + headwind) * np.abs(v + headwind) + c * v - power
+    grid = np.linspace(0.0, 150.0, 30001)
+    crossing = np.nonzero((f(grid[:-1]) <= 0) & (f(grid[1:]) > 0))[0]
+    lo, hi = grid[crossing[-1]], grid[crossing[-1] + 1]
+    for _ in range(60):
+        mid = 0.5 * (lo + hi)
+        lo, hi = (mid, hi) if f(mid) <= 0 else (lo, mid)
+    return max(lo, 0.1)
+
+
+def test_tailwind_on_descent():
+    v = pe.solve_velocity_wind(300.0, -0.05, -15.0, pc.RHO, pc.CDA)
+    assert v > 15.0
+    assert v == pytest.approx(largest_root(300.0, -0.05, -15.0), rel=1e-9)
+
+
+@pytest.mark.parametrize("power", [0.0, 300.0])
+def test_matches_largest_root_over_slope_and_wind(power):
+    slopes, winds = np.meshgrid(np.linspace(-0.15, 0.15, 31), np.linspace(-20.0, 10.0, 31))
+    v = pe.solve_velocity_wind(power, slopes, winds, pc.RHO, pc.CDA)
+    expected = np.vectorize(largest_root)(power, slopes, winds)
+    np.testing.assert_allclose(v, expected, rtol=1e-9, atol=1e-9)